@@ -0,0 +1,1548 @@
+#!/bin/python3
+
+# Newton-Raphon method process control
+# The idea is to find the input 'x' that gives an output closest to target
+#
+# There is (optional) bounding limits on x: 'lo' and 'hi' 
+# you can start with an (optional) initial guess 'x0'
+# You can set the allowable error 'error' margin (2-sided)
+#
+# needs no other modules
+#
+# Method:
+# Newton-Raphson for finding a function zero:
+# x1 = x0 - f(x0)/f'(x0)
+#
+# since we don't have a derivative, we need to points to get a difference
+# We could choose 2 close points, but that would lead to instability with small output errors
+# so we choose the midpoint
+#
+# Written by Paul H Alfille 2020
+# MIT license
+#
+# see https://github.com/alfille/NewtRap
+#
+# Usage:
+# import newtrap
+# target = 10
+# error = .2
+# x0 = 1
+# lo = 0
+# hi = 2
+# nr = newtrap.NewtRap( target, error=error, lo=lo, hi=hi, x0=x0 )
+#
+# x = x0
+# while True:
+#     y = my_process(x)
+#     print(x,y)
+#     x = nr.next(y)
+
+# Add better initial conditions and input filtering
+# Add measurement (y) filter chain -- same get/set by name as the x chain
+# Add noise floor calibration -- repeated measurements at a fixed x
+# Add stochastic approximation (Robbins-Monro) once the pair is inside the noise
+# Add characteristic scales for x and y -- no absolute offsets
+# Add bracket expansion (doubling) when x is not bounded on both sides
+# Add log(x) mode for processes spanning decades
+# Add trust region -- adaptive limit on the step size
+# Add NewtRap3 -- three point sets with inverse quadratic interpolation
+# Add secant mode -- reuse the last point, one new measurement per update
+# Add unreachable target detection and golden section search for the closest output
+# Add bound pinning detection -- reflect back into the range after repeated clamps
+# Add stall detection -- damp a 2-cycle, bisect the last crossing when stuck
+# Add plant change detection -- CUSUM on the prediction residual, flush the slope
+# Add dead time -- hold each new x until its response arrives, or estimate the delay
+# Add timestamps -- drop stale readings, filter constants per time not per call
+
+import bisect
+import math
+
+class _slope:
+    def __init__(self):
+        # keep keep slowly decaying average slope
+        self.abs_sum_y = 0
+        self.abs_sum_x = 0
+        self.sign = -1
+        self.default = 1 # before any slope is seen
+    @property
+    def slope_average(self):
+        if self.abs_sum_x != 0:
+            s = self.abs_sum_y / self.abs_sum_x
+        else:
+            s = self.default
+        self.sign = -self.sign
+        return self.sign * s
+
+    def add_slope(self,dy, dx ):
+        if dx != 0:
+            self.abs_sum_y = .99999 * self.abs_sum_y + abs(dy)
+            self.abs_sum_x = .99999 * self.abs_sum_x + abs(dx)
+
+_golden = ( 5 ** .5 - 1 ) / 2 # golden section ratio
+_logmax = 700. # largest |log(x)|, unbounded log mode
+
+def _log( x ):
+    # log of a positive value, None otherwise
+    if x is None or x <= 0:
+        return None
+    return math.log( x )
+
+def _xscale( lo, hi, x0 ):
+    # characteristic size of x from whatever we are given
+    if lo is not None and hi is not None and hi > lo:
+        return hi - lo
+    for v in ( x0, hi, lo ):
+        if v is not None and v != 0:
+            return abs(v)
+    return 1.
+
+class _welford:
+    # running mean and variance (Welford)
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+
+    def add(self, y):
+        self.count += 1
+        d = y - self.mean
+        self.mean += d / self.count
+        self.m2 += d * ( y - self.mean )
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.
+        return self.m2 / ( self.count - 1 )
+
+    @property
+    def std(self):
+        return self.variance ** .5
+
+class _filter():
+    def __init__( self, value = None, chain = None ):
+        self.value = value
+        self.chain = chain
+        self._lastx = None
+       
+    @property
+    def lastx(self):
+        x = self._lastx
+        if self.chain is not None:
+            if self.chain.lastx is not None:
+                return self.chain.lastx
+        return x
+    
+    @lastx.setter
+    def lastx(self,x):
+        self._lastx = x
+        if self.chain is not None:
+            x = self.chain.lastx = x
+    
+    def get(self, name):
+        if name == type(self).__name__:
+            return self.value
+        elif self.chain:
+            return self.chain.get(name)
+        else:
+            return None
+
+    def set(self, name, value):
+        if name == type(self).__name__:
+            self.value = value
+        if self.chain:
+            self.chain.set(name, value )
+
+    def apply( self, x ):
+        x = self._apply(x)
+        if self.chain:
+            x = self.chain.apply( x )
+        self._lastx = x
+        return x
+
+    def prime( self, x ):
+        # restart history at a known good value
+        self._prime(x)
+        if self.chain:
+            self.chain.prime( x )
+        self._lastx = x
+
+    def _prime( self, x ):
+        pass
+
+    def shift( self, dy ):
+        # move history along with the x it was measured at
+        self._shift(dy)
+        if self.chain:
+            self.chain.shift( dy )
+
+    def _shift( self, dy ):
+        pass
+
+    def follow( self, alpha ):
+        # controller's input filter weight, for filters without their own
+        self._follow(alpha)
+        if self.chain:
+            self.chain.follow( alpha )
+
+    def _follow( self, alpha ):
+        pass
+
+    def reset( self ):
+        # forget history
+        self._reset()
+        if self.chain:
+            self.chain.reset()
+        self._lastx = None
+
+    def _reset( self ):
+        pass
+                
+class _lo(_filter):
+    # Lower boundary
+    def _apply( self, x ):
+        if self.value is not None:
+            if x < self.value:
+                x = self.value
+        return x
+    
+class _hi(_filter):
+    # Upper boundary
+    def _apply( self, x ):
+        if self.value is not None:
+            if x > self.value:
+                x = self.value
+        return x
+
+class _iir(_filter):
+    # Infinite filter
+    def __init__(self, value=.50, chain = None ):
+        # value is decay factor
+        super().__init__(value, chain)
+        # Needs to alternate
+        self.last_IIR_x = None
+        
+    def _apply( self, x ):
+        if self.value is not None:
+            lx = self.last_IIR_x
+            self.last_IIR_x = x
+            if lx is not None:
+                x = self.value * x + (1-self.value) * lx
+        return x
+
+class _logx(_filter):
+    # controller works on log(x), the rest of the chain still sees x
+    def apply( self, u ):
+        # bounds in log space first -- exp overflows past ~709
+        lo = _log( self.chain.get('_lo') )
+        hi = _log( self.chain.get('_hi') )
+        if lo is not None and u < lo:
+            u = lo
+        if hi is not None and u > hi:
+            u = hi
+        u = min( max( u, -_logmax ), _logmax )
+        x = self.chain.apply( math.exp( u ) )
+        self._lastx = x
+        if x <= 0:
+            # only from a bound at or below zero -- nothing to respect
+            return u
+        return math.log( x )
+
+class _end(_filter):
+    # does nothing
+    def _apply( self, x ):
+        return x
+
+# Measurement (y) filters
+# One chain per half of the pair, since each half is measured at a different x
+# All storage is allocated up front (or on a size change), not per sample
+
+class _yiir(_filter):
+    # Low pass (IIR) on the measurement
+    def __init__(self, value=None, chain = None ):
+        # value is weight of the new reading (1. is no filtering)
+        # None follows the controller's input filter weight
+        super().__init__(value, chain)
+        self.alpha = 1. # controller's weight
+        self.last_IIR_y = None
+
+    def _follow( self, alpha ):
+        self.alpha = alpha
+
+    def _apply( self, y ):
+        w = self.alpha if self.value is None else self.value
+        if self.last_IIR_y is not None:
+            y = w * y + (1-w) * self.last_IIR_y
+        self.last_IIR_y = y
+        return y
+
+    def _prime( self, y ):
+        self.last_IIR_y = y
+
+    def _reset( self ):
+        self.last_IIR_y = None
+
+    def _shift( self, dy ):
+        # fixed weights only -- following the schedule it is the unshifted
+        # newtrap_13 filter, and shifting stalls unexpanded creep
+        if self.value is not None and self.last_IIR_y is not None:
+            self.last_IIR_y += dy
+
+class _window(_filter):
+    # Ring buffer of the last 'value' readings
+    def __init__(self, value=None, chain = None ):
+        super().__init__(value, chain)
+        self.ring = []
+        self.count = 0
+        self.pos = 0
+
+    def size( self ):
+        if self.value is None:
+            return 0
+        n = int(self.value)
+        if n != len(self.ring):
+            # resize only when the setting changes
+            self.ring = [0.] * n
+            self.clear()
+        return n
+
+    def clear( self ):
+        self.count = 0
+        self.pos = 0
+        self._clear()
+
+    def _reset( self ):
+        self.clear()
+
+    def _shift( self, dy ):
+        for i in range(len(self.ring)):
+            self.ring[i] += dy
+
+    def push( self, y ):
+        # returns the value pushed out (or None)
+        old = None
+        if self.count == len(self.ring):
+            old = self.ring[self.pos]
+        else:
+            self.count += 1
+        self.ring[self.pos] = y
+        self.pos += 1
+        if self.pos == len(self.ring):
+            self.pos = 0
+        return old
+
+    def _prime( self, y ):
+        # fill with the known good value
+        if self.size() > 1:
+            self.clear()
+            for i in range(len(self.ring)):
+                self._apply(y)
+
+class _average(_window):
+    # Moving average -- value is window length
+    def _clear( self ):
+        self.total = 0.
+
+    def _apply( self, y ):
+        if self.size() <= 1:
+            return y
+        old = self.push(y)
+        if old is not None:
+            self.total -= old
+        self.total += y
+        return self.total / self.count
+
+    def _shift( self, dy ):
+        super()._shift(dy)
+        self.total += self.count * dy
+
+class _median(_window):
+    # Moving median -- value is window length
+    def __init__(self, value=None, chain = None ):
+        self.ordered = []
+        super().__init__(value, chain)
+
+    def _clear( self ):
+        self.ordered.clear()
+
+    def _apply( self, y ):
+        if self.size() <= 1:
+            return y
+        old = self.push(y)
+        if old is not None:
+            del self.ordered[bisect.bisect_left(self.ordered, old)]
+        bisect.insort(self.ordered, y)
+        m = self.count // 2
+        if self.count % 2 == 1:
+            return self.ordered[m]
+        return .5 * ( self.ordered[m-1] + self.ordered[m] )
+
+    def _shift( self, dy ):
+        super()._shift(dy)
+        for i in range(len(self.ordered)):
+            self.ordered[i] += dy
+
+class _gate(_filter):
+    # Outlier gate -- value is the largest believable jump
+    # a rejected reading is replaced by the last good one
+    # a second rejection in a row means the process really moved
+    def __init__(self, value=None, chain = None, limit = 1 ):
+        super().__init__(value, chain)
+        self.limit = limit
+        self.last_good = None
+        self.rejected = 0
+
+    def _apply( self, y ):
+        if self.value is not None:
+            if self.last_good is not None and abs(y - self.last_good) > self.value and self.rejected < self.limit:
+                self.rejected += 1
+                return self.last_good
+            self.rejected = 0
+            self.last_good = y
+        return y
+
+    def _prime( self, y ):
+        self.last_good = y
+        self.rejected = 0
+
+    def _reset( self ):
+        self.last_good = None
+        self.rejected = 0
+
+    def _shift( self, dy ):
+        if self.last_good is not None:
+            self.last_good += dy
+
+_yfilters = {
+    '_yiir':    _yiir,
+    '_average': _average,
+    '_median':  _median,
+    '_gate':    _gate,
+    }
+
+def _ychain( yfilter ):
+    # build a measurement chain from a list of names or (name, value)
+    # first listed is applied first
+    chain = _end()
+    for f in reversed(yfilter):
+        if isinstance(f,str):
+            chain = _yfilters[f]( chain = chain )
+        else:
+            chain = _yfilters[f[0]]( value = f[1], chain = chain )
+    return chain
+
+class NewtRap():
+    # Newton Raphson 's method for control
+    # Uses 2 points to find derivative, so needs 2 measurements
+    # Remembers internally which measurement
+    # Lots of care with all the special cases
+    def __init__(self, target=1, error = None, lo=None, hi=None, x0=None, yfilter=None, calibrate=0, sigmas=2., widen=True, stochastic=False, expand=True, logx=False, logy=False, trust=False, secant=False, seek=False, escape=True, damping=True, detect=True, delay=0, period=None, settle=0.):
+        self._target = target
+        self.slope = _slope()
+        
+        if error is not None:
+            self._error = abs(error)
+        elif self._target == 0:
+            self._error = .01
+        else:
+            self._error = .01 * abs(self._target)
+        self.request_error = self._error # before any calibration
+
+        # noise calibration
+        self.noise = _welford()
+        self.sigmas = sigmas # band is this many standard deviations
+        self.widen = widen # widen band to the noise, or just report
+        self.noise_floor = None
+        self.reachable = True
+        self.calibrating = 0
+
+        # stochastic approximation
+        self.stochastic = stochastic # allow switch when pair is inside noise
+        self.sa_n = 0 # steps taken (0 = not active)
+
+        # sort and set lo and hi
+        if lo is not None and hi is not None:
+            if lo > hi:
+                s = hi
+                hi = lo
+                lo = s
+
+        # both always in the chain (None is no bound), for the setters
+        self.chain = _end()
+        self.chain = _lo( value=lo, chain = self.chain )
+        self.chain = _hi( value=hi, chain = self.chain )
+        self.bound = self.chain # before any filtering
+        # IIR filter
+        self.chain = _iir( value = 1., chain = self.chain )
+
+        self.logx = logx
+        self.logstep = 3 * math.log( 10 ) # largest step in log(x), three decades
+        self.logy_request = logy # log(y) needs a positive target, see new_settings
+        if logx:
+            # work on log(x) -- bounds and filters still act on x
+            self.chain = _logx( chain = self.chain )
+            self.bound = _logx( chain = self.bound )
+            # start-up pair and scale in log(x)
+            lo, hi, x0 = _log(lo), _log(hi), _log(x0)
+
+        # bracket expansion -- only needed without both bounds
+        self.expand_request = expand
+        self.expand = expand and ( lo is None or hi is None )
+        self.expanding = False
+        self.expand_limit = 60 # probes before giving up
+
+        # unreachable target -- search for the closest output instead
+        self.seek = seek
+        self.side_limit = 5 # pairs on one side without progress
+        self.seeking = False
+        self.unreachable = False
+        self.extremum = None # best x found while seeking
+        self.closest = None # output there
+
+        # bound pinning -- steps clamped at the same bound without progress
+        self.escape = escape
+        self.pin_base = 2 # clamps before the first escape
+        self.reflect = .25 # escape distance, fraction of the span
+        self.pinned = 0 # escapes so far
+
+        # stalls -- 2-cycles and stagnation from the last few updates
+        self.damping = damping
+        self.damp_min = 1. / 8 # smallest step fraction
+        self.stalls = 0 # damped or bisected updates so far
+
+        # plant changes -- CUSUM of the new pair against the last pair's line
+        self.detect = detect
+        self.cusum_k = .5 # allowance, in residual scales
+        self.cusum_h = 8. # alarm level, in residual scales
+        self.cusum_warm = 8 # residuals to learn the scale before any alarm
+        self.changes = 0 # plant changes seen so far
+
+        # secant mode -- no midpoint, one new x per update
+        self.secant = secant
+        self.stepping = False
+
+        # trust region
+        self.trust = trust
+        self.grow = 2. # radius change after progress
+        self.shrink = .5 # radius change otherwise
+        self.bounded = ( lo is not None and hi is not None )
+
+        # characteristic scales -- offsets are in these units, not absolute
+        self.xscale = _xscale( lo, hi, x0 )
+        if self._target != 0:
+            self.yscale = abs( self._target )
+        elif self._error != 0:
+            self.yscale = 100 * self._error
+        else:
+            # nothing to go on -- unit default slope, as newtrap_13
+            self.yscale = self.xscale
+        self.slope.default = self.yscale / self.xscale
+        d = .1 * self.xscale
+        
+        # initial x's -- lot's of cases
+        if x0 is not None:
+            self.xpair0 = self.bound.apply( x0 )
+            self.xpair1 = self.bound.apply( x0 - 2*d )
+        elif lo is None: # no lo        
+            if hi is None: # unbounded
+                # no scale to go on -- slow for roots far below 1 (newtrap_test13)
+                self.xpair0 = self.bound.apply( 1 )
+                self.xpair1 = self.bound.apply( 3 )
+            else: # hi only
+                self.xpair0 = self.bound.apply( hi - 2*d )
+                self.xpair1 = self.bound.apply( hi )
+        elif hi is None: # lo only
+                self.xpair0 = self.bound.apply( lo )
+                self.xpair1 = self.bound.apply( lo + 2*d )
+        else: # bounded
+            self.xpair0 = self.bound.apply( .6 * lo + .4 * hi - d )
+            self.xpair1 = self.bound.apply( .4 * lo + .6 * hi + d )
+            
+        self.inputdecay = .99
+
+        # measurement filters, one chain for each half of the pair
+        if yfilter is None:
+            yfilter = ( '_yiir', )
+        self.ychain0 = _ychain( yfilter )
+        self.ychain1 = _ychain( yfilter )
+        
+        # protect snoopers
+        self.ypair0 = None
+        self.ypair1 = None
+        self.dydx = None # last secant slope
+        
+        # dead time -- readings arrive 'delay' calls after their x
+        self.delay = 0
+        self.delay_wait = 0 # calls left before the held x is measured
+        self.xheld = None
+        self.finding = 0
+        self.delay_ticks = None
+        self.delay_noise = _welford()
+
+        # timestamps -- optional time of each reading
+        self.period = period # nominal time between readings (None = learn it)
+        self.learn_period = ( period is None )
+        self.settle = settle # time after a new x before readings count
+        self.tlast = None # time of the last reading used
+        self.tseen = None # time of the last reading accepted (held or used)
+        self.tsent = None # time the held x was sent
+        self.elapsed = 1. # since the last reading used, in periods
+
+        self.new_settings()
+        self.calibrate( calibrate )
+        if delay is None:
+            self.find_delay()
+        else:
+            self.delay = delay
+        
+    def next( self, value, t = None ):
+        # x is returned in the original space, even in log mode
+        # t is the time of the reading (optional)
+        if t is not None and not self.fresh( t ):
+            # stale reading -- x stays put
+            x = self.xheld
+        elif self.delay_wait > 0:
+            # dead time -- the response to the held x is still on its way
+            self.delay_wait -= 1
+            x = self.xheld
+        elif self.xheld is not None and not math.isfinite( value ):
+            # no usable reading (dropout, overflow) -- x stays put
+            x = self.xheld
+        else:
+            if t is not None:
+                self.used( t )
+            if self.finding > 0 or self.delay_ticks is not None:
+                x = self.delay_step( value )
+            else:
+                x = self._next( value )
+            if x != self.xheld:
+                self.delay_wait = self.delay
+                self.tsent = t
+            self.xheld = x
+        if self.logx:
+            return math.exp( x )
+        return x
+
+    def fresh( self, t ):
+        # True if the reading at time t is new and was taken after the
+        # held x had settled -- also learns the period between readings
+        if self.tseen is not None and t <= self.tseen:
+            # repeated or out of order
+            return False
+        if self.tsent is not None and t <= self.tsent + self.settle:
+            # taken before the new x had its effect
+            return False
+        if self.tseen is not None and self.learn_period:
+            dt = t - self.tseen
+            if self.period is None:
+                self.period = dt
+            else:
+                self.period = .9 * self.period + .1 * dt
+        self.tseen = t
+        return True
+
+    def used( self, t ):
+        # the reading at time t reached the controller -- the filters
+        # weight it by the time since the last one that did
+        if self.tlast is not None and self.period:
+            self.elapsed = ( t - self.tlast ) / self.period
+        self.tlast = t
+
+    def _next( self, value ):
+        # prime the pump
+        if self.very_first:
+            # ignore value (no context)
+            self.very_first = False
+            self.first = True # which part of the pair?
+            return self.xpair0
+            
+        # noise calibration -- hold xpair0 and repeat
+        if self.calibrating > 0:
+            self.noise.add( value )
+            self.calibrating -= 1
+            if self.calibrating > 0:
+                return self.xpair0
+            self.calibrated()
+            # last reading counts as the xpair0 measurement
+
+        # value is from previous x
+        y = self.deviation( value )
+
+        if self.sa_n > 0:
+            return self.sa_step( y )
+
+        if self.expanding:
+            return self.expand_step( y )
+
+        if self.seeking:
+            return self.golden_step( y )
+        
+        perfect = (abs(y) <= self._error)
+        if perfect or ( y < 0 ) != self.side_sign:
+            # target reached or crossed -- any one sided run is over
+            self.side_sign = None
+
+        if self.stepping:
+            # secant mode, value is from the newest point xpair1
+            self.ypair1 = y
+            if perfect:
+                # within tolerances, repeat
+                self.chain.apply(self.xpair1)
+                return self.xpair1
+            return self.pair_complete()
+        
+        # input filter, weight of a new value for the time since the last one
+        if self.elapsed == 1:
+            # one period -- exactly the per call weight
+            alpha = self.inputalpha
+        else:
+            alpha = 1. - ( 1. - self.inputalpha ) ** self.elapsed
+        self.chain.set('_iir',alpha)
+        self.ychain0.follow(alpha)
+        self.ychain1.follow(alpha)
+        if self.first:
+            # increasingly weight old values
+            self.inputalpha *= self.inputdecay ** self.elapsed
+            # from xpair0
+            if perfect:
+                # within tolerances, repeat
+                self.ypair0 = y
+                self.ychain0.prime(y)
+                
+                # Overtrain filters
+                self.chain.apply(self.xpair0)
+                
+                # (re)send good value
+                return self.xpair0
+            else:
+                # filter y value
+                self.ypair0 = self.ychain0.apply(y)
+
+                # first half of pair complete, send second half
+                self.first = False
+
+                return self.xpair1
+        else:
+            # from xpair1
+            if perfect:
+                # within tolerances, repeat
+                self.ypair1 = y
+                self.ychain1.prime(y)
+                
+                # Overtrain filters
+                self.chain.apply(self.xpair1)
+                
+                # (re)send good value
+                return self.xpair1
+            else:
+                # filter y value
+                self.ypair1 = self.ychain1.apply(y)
+
+                return self.pair_complete()
+
+    def deviation( self, value ):
+        # signed distance from target
+        if self.logy:
+            # same as value - target near the target, compressed far away
+            return self._target * math.log( max( value, 1e-300 ) / self._target )
+        return value - self._target
+
+    def pair_complete( self ):
+        # pair complete with results, calculate next pair
+        if self.secant:
+            # from here on, one new point per update
+            # the last two points stand in for the pair
+            self.stepping = True
+            if self.seek and self.side_watch():
+                return self.golden_start()
+            return self.secant_next()
+        if self.detect and self.change_check():
+            return self.plant_changed()
+        if self.seek and self.side_watch():
+            return self.golden_start()
+        if self.trust:
+            self.trust_update()
+        x0, x1 = self.xpair0, self.xpair1
+        self.xpair0, self.xpair1  = self.new_pair()
+        # line through the old pair, to check the new one against
+        self.predict = ( .5 * ( x0 + x1 ), .5 * ( self.ypair0 + self.ypair1 ), self.signed_slope() )
+        m = self.signed_slope()
+        if m is not None:
+            # keep filter history comparable at the new x's
+            self.ychain0.shift( m * ( self.xpair0 - x0 ) )
+            self.ychain1.shift( m * ( self.xpair1 - x1 ) )
+        self.first = True
+
+        if self.sa_ready( self.xpair0 - self.xpair1 ):
+            # pair can no longer see the slope through the noise
+            return self.sa_start( self.xpair0 )
+
+        return self.xpair0
+
+    def change_check( self ):
+        # CUSUM of the new pair's residuals from the last pair's line
+        # True once the plant has clearly moved, not just the noise
+        if self.predict is None or self.predict[2] is None:
+            return False
+        xm, ym, m = self.predict
+        for x, y in ( ( self.xpair0, self.ypair0 ), ( self.xpair1, self.ypair1 ) ):
+            self.cusum_add( y - ( ym + m * ( x - xm ) ) )
+        return max( self.cusum_hi, self.cusum_lo ) > self.cusum_h
+
+    def cusum_add( self, r ):
+        # one residual into the CUSUM, True on alarm
+        if self.rscale is None:
+            self.rscale = abs(r)
+        # floored -- with no band and exact readings both can be 0
+        sc = max( self.yfloor(), self.rscale, 1e-12 * self.yscale )
+        if self.cusum_n >= self.cusum_warm:
+            z = r / sc
+            self.cusum_hi = max( 0., self.cusum_hi + z - self.cusum_k )
+            self.cusum_lo = max( 0., self.cusum_lo - z - self.cusum_k )
+        # typical residual size -- clipped so a real change can't hide itself
+        self.rscale = .9 * self.rscale + .1 * min( abs(r), 4 * sc )
+        self.cusum_n += 1
+        return max( self.cusum_hi, self.cusum_lo ) > self.cusum_h
+
+    def plant_changed( self, x = None ):
+        # the learned slope is for the old plant -- flush it and start a
+        # fresh pair about x (default the closer point), keeping the settings
+        self.changes += 1
+        self.slope.abs_sum_y = 0
+        self.slope.abs_sum_x = 0
+        self.dydx = None
+        if x is None:
+            if abs(self.ypair0) < abs(self.ypair1):
+                x = self.xpair0
+            else:
+                x = self.xpair1
+        d = .1 * self.xscale
+        self.xpair0 = self.bound.apply( x )
+        self.xpair1 = self.bound.apply( x - 2*d )
+        if self.xpair1 == self.xpair0:
+            self.xpair1 = self.bound.apply( x + 2*d )
+        self.new_settings()
+        # xpair0 is sent now, no need to prime the pump
+        self.very_first = False
+        self.first = True
+        return self.xpair0
+
+    def side_watch( self ):
+        # True when y stays on one side of the target without getting closer
+        # and there is a reason -- the slope changing sign (an extremum in
+        # between) or x held at a bound
+        best = min( abs(self.ypair0), abs(self.ypair1) )
+        sign = ( self.ypair0 < 0 )
+        xlo = min( self.xpair0, self.xpair1 )
+        xhi = max( self.xpair0, self.xpair1 )
+        dx = self.xpair0 - self.xpair1
+        dy = self.ypair0 - self.ypair1
+        if dx != 0 and dy != 0:
+            rising = ( ( dy > 0 ) == ( dx > 0 ) )
+        else:
+            rising = None
+        if self.side_sign is None or ( self.ypair1 < 0 ) != sign or sign != self.side_sign:
+            # (re)start the one sided run
+            self.side_sign = sign
+            self.side_best = best
+            self.side_stale = 0
+            self.side_flips = 0
+            self.side_pinned = 0
+            self.side_rising = rising
+            self.side_lo = xlo
+            self.side_hi = xhi
+            return False
+        self.side_lo = min( self.side_lo, xlo )
+        self.side_hi = max( self.side_hi, xhi )
+        if rising is not None:
+            if self.side_rising is not None and rising != self.side_rising:
+                self.side_flips += 1
+            self.side_rising = rising
+        if rising is not None:
+            xn = .5 * ( self.xpair0 + self.xpair1 ) - .5 * ( self.ypair0 + self.ypair1 ) * dx / dy
+            if self.bound.apply( xn ) != xn:
+                # Newton-Raphson wants to go past a bound
+                self.side_pinned += 1
+        if best < .9 * self.side_best:
+            # still getting closer
+            self.side_best = best
+            self.side_stale = 0
+        else:
+            self.side_stale += 1
+        if self.side_stale < self.side_limit:
+            return False
+        if self.side_pinned >= self.side_limit:
+            return True
+        # slope flips from noise on a collapsed pair don't count
+        return self.side_flips >= 2 and self.side_hi - self.side_lo > .01 * self.xscale
+
+    def golden_start( self ):
+        # search the x's seen on this side for the smallest |y|
+        self.seeking = True
+        self.predict = None
+        self.unreachable = True
+        w = max( .5 * ( self.side_hi - self.side_lo ), .1 * self.xscale )
+        self.ga = self.bound.apply( self.side_lo - w )
+        self.gb = self.bound.apply( self.side_hi + w )
+        self.gc = self.gb - _golden * ( self.gb - self.ga )
+        self.gd = self.ga + _golden * ( self.gb - self.ga )
+        self.ga0, self.gb0 = self.ga, self.gb
+        self.gyc = None
+        self.gyd = None
+        self.extremum = None
+        self.closest = None
+        self.gx = self.gc # being measured
+        return self.gx
+
+    def golden_step( self, y ):
+        # one measurement per step, minimizing |y|
+        if abs(y) <= self._error or ( y < 0 ) != self.side_sign:
+            # crossed the target after all
+            return self.golden_end( y )
+
+        if self.extremum is None or abs(y) < abs( self.closest - self._target ):
+            self.extremum = self.gx
+            self.closest = y + self._target
+
+        if self.gb - self.ga < 1e-3 * self.xscale:
+            if self.golden_edge():
+                # best is at an open end of the search, so the closest output
+                # is further out -- a slow stretch, not an unreachable target
+                self.gx = self.extremum
+                return self.golden_end( y )
+            # search done, hold the best and keep watching
+            self.gx = self.extremum
+            return self.gx
+
+        if self.gx == self.gc:
+            self.gyc = abs(y)
+        else:
+            self.gyd = abs(y)
+        if self.gyd is None:
+            self.gx = self.gd
+            return self.gx
+
+        # both inner points known, drop one end
+        if self.gyc < self.gyd:
+            self.gb, self.gd, self.gyd = self.gd, self.gc, self.gyc
+            self.gc = self.gb - _golden * ( self.gb - self.ga )
+            self.gx = self.gc
+        else:
+            self.ga, self.gc, self.gyc = self.gc, self.gd, self.gyd
+            self.gd = self.ga + _golden * ( self.gb - self.ga )
+            self.gx = self.gd
+        return self.gx
+
+    def golden_edge( self ):
+        # best x is at an end of the search range that is not a bound
+        near = 1e-2 * ( self.gb0 - self.ga0 )
+        d = .01 * self.xscale
+        if abs( self.extremum - self.ga0 ) < near and self.bound.apply( self.ga0 - d ) != self.ga0:
+            return True
+        if abs( self.extremum - self.gb0 ) < near and self.bound.apply( self.gb0 + d ) != self.gb0:
+            return True
+        return False
+
+    def golden_end( self, y ):
+        # back to Newton-Raphson, with a pair starting where we are
+        self.seeking = False
+        self.unreachable = False
+        self.side_sign = None
+        x = self.gx
+        self.xpair0 = x
+        self.xpair1 = self.bound.apply( x + .01 * self.xscale )
+        if self.xpair1 == x:
+            self.xpair1 = self.bound.apply( x - .01 * self.xscale )
+        self.ypair0 = y
+        self.first = False
+        return self.xpair1
+
+    def secant_next( self ):
+        # secant through the two most recent points, newest is xpair1
+        if self.trust:
+            self.trust_update()
+        dx = self.xpair1 - self.xpair0
+        dy = self.ypair1 - self.ypair0
+        if dx == 0 or dy == 0:
+            self.dydx = None
+            # Need an arbitrary angle -- illegal slope otherwise
+            x2 = self.xpair1 - self.ypair1 / self.slope.slope_average
+        else:
+            self.slope.add_slope( dy, dx )
+            self.dydx = dy / dx
+            x2 = self.xpair1 - self.ypair1 * dx / dy
+
+        if self.trust and abs( x2 - self.xpair1 ) > self.radius:
+            # step limited to the trust region
+            x2 = self.xpair1 + math.copysign( self.radius, x2 - self.xpair1 )
+        x2 = self.log_limit( self.xpair1, x2 )
+        x2 = self.stall_check( self.xpair1, self.ypair1, x2 )
+        x2 = self.pin_check( x2, min( abs(self.ypair0), abs(self.ypair1) ) )
+        x2 = self.chain.apply(x2)
+
+        # oldest point drops out
+        self.xpair0, self.ypair0 = self.xpair1, self.ypair1
+        self.xpair1 = x2
+
+        if self.sa_ready( x2 - self.xpair0 ):
+            # steps can no longer see the slope through the noise
+            return self.sa_start( x2 )
+        return x2
+
+    def expand_step( self, y ):
+        # double the probe step until y - target changes sign
+        if self.ya is None:
+            # xpair0 measured, first probe
+            self.ya = y
+            self.probes = 0
+            self.turned = False
+            return self.probe( self.xa + self.h )
+
+        if abs(y) <= self._error:
+            # landed in the band, measure here as a normal pair
+            self.expanding = False
+            self.xpair0 = self.xprobe
+            self.xpair1 = self.bound.apply( self.xa )
+            self.first = True
+            return self.xpair0
+
+        self.probes += 1
+        if ( y < 0 ) != ( self.ya < 0 ) or self.probes >= self.expand_limit:
+            # bracket found (or no luck) -- hand over to Newton-Raphson
+            return self.expand_done( y )
+
+        if abs(y) > abs(self.ya) + self._error:
+            # clearly the wrong way
+            if self.turned:
+                # worse both ways -- nothing to bracket
+                return self.expand_done( y )
+            # turn around
+            self.h = self.log_limit( 0, -2 * self.h )
+            self.turned = True
+        else:
+            # right way (or too close to tell), keep going
+            self.xa, self.ya = self.xprobe, y
+            self.h = self.log_limit( 0, 2 * self.h )
+            self.turned = False
+        xb = self.probe( self.xa + self.h )
+        if xb == self.xa:
+            # pinned against the one bound
+            return self.expand_done( y )
+        return xb
+
+    def expand_start( self ):
+        # begin from xpair0, first step is the pair spacing
+        self.expanding = True
+        self.xa = self.xpair0
+        self.ya = None
+        self.h = self.xpair1 - self.xpair0
+        if self.h == 0:
+            self.h = .1 * self.xscale
+
+    def probe( self, x ):
+        self.xprobe = self.bound.apply( x )
+        return self.xprobe
+
+    def expand_done( self, y ):
+        # last two points become the pair
+        self.expanding = False
+        self.xpair0, self.ypair0 = self.xprobe, y
+        self.xpair1, self.ypair1 = self.xa, self.ya
+        self.ychain0.prime( self.ypair0 )
+        self.ychain1.prime( self.ypair1 )
+        return self.pair_complete()
+
+    def stall_check( self, x, y, xn ):
+        # x, y is the current estimate, xn the proposed next x
+        # y changing sign without shrinking -- damp the step
+        # y on one side without shrinking after a crossing -- bisect
+        if not self.damping:
+            return xn
+        h = self.yhist
+        h.append( y )
+        if len( h ) > 4:
+            del h[0]
+        for xp, yp in ( ( self.xpair0, self.ypair0 ), ( self.xpair1, self.ypair1 ) ):
+            # bracket from measured points -- pair averages are biased by curvature
+            if yp < 0:
+                self.xneg = xp
+            elif yp > 0:
+                self.xpos = xp
+        if len( h ) < 4:
+            return xn
+        s = [ v < 0 for v in h ]
+        changes = ( s[0] != s[1] ) + ( s[1] != s[2] ) + ( s[2] != s[3] )
+        if changes >= 2:
+            if abs( h[3] ) > .5 * min( abs( v ) for v in h[:3] ):
+                # 2-cycle, or noise flipping the sign
+                self.stalls += 1
+                self.damp = max( .5 * self.damp, self.damp_min )
+                return x + self.damp * ( xn - x )
+        elif s[0] == s[1] == s[2] == s[3]:
+            if abs( h[3] ) > .9 * min( abs( v ) for v in h[:3] ) and self.xneg is not None and self.xpos is not None:
+                # stuck on one side of a crossing already seen
+                self.stalls += 1
+                xb = .5 * ( self.xneg + self.xpos )
+                # the far end may be stale -- needs a new crossing to bisect again
+                if y < 0:
+                    self.xpos = None
+                else:
+                    self.xneg = None
+                return xb
+        if abs( h[3] ) < .5 * min( abs( v ) for v in h[:3] ):
+            # progress -- back towards full steps
+            self.damp = min( 2. * self.damp, 1. )
+        return x + self.damp * ( xn - x )
+
+    def pin_check( self, x, best ):
+        # count steps clamped against the same bound with |y| not improving
+        # after pin_limit of them, reflect back into the range instead
+        xb = self.bound.apply( x )
+        if xb == x:
+            # free step
+            self.pin_side = None
+            return x
+        side = ( x > xb ) # True for hi
+        if side != self.pin_side:
+            self.pin_side = side
+            self.pin_best = best
+            self.pin_count = 0
+        elif best < .9 * self.pin_best:
+            # clamped but still getting closer
+            self.pin_best = best
+            self.pin_count = 0
+            self.pin_limit = self.pin_base
+        self.pin_count += 1
+        if not self.escape or self.pin_count < self.pin_limit:
+            return x
+        self.pinned += 1
+        self.pin_count = 0
+        # target may really be past the bound -- wait longer next time
+        self.pin_limit *= 2
+        lo, hi = self.xlimits()
+        if lo is not None and hi is not None:
+            d = self.reflect * ( hi - lo )
+        else:
+            d = self.reflect * self.xscale
+        if side:
+            return xb - d
+        return xb + d
+
+    def yfloor( self ):
+        # smallest meaningful y -- the band, or the noise if that is bigger
+        if self.noise_floor is not None:
+            return max( self.noise_floor, self._error )
+        return self._error
+
+    def trust_update( self ):
+        # grow the radius after progress, shrink it otherwise
+        best = min( abs(self.ypair0), abs(self.ypair1) )
+        floor = self.yfloor()
+        if self.lastbest is not None:
+            if best < self.lastbest:
+                self.radius *= self.grow
+                if self.bounded:
+                    self.radius = min( self.radius, self.xscale )
+            elif best > floor:
+                # no progress, and not for lack of room
+                self.radius = max( self.radius * self.shrink, 1e-9 * self.xscale )
+        self.lastbest = best
+
+    def log_limit( self, x, xn ):
+        # log(x) mode -- no step from x longer than logstep, or a flat
+        # stretch sends x to the end of the float range in one step
+        if self.logx and abs( xn - x ) > self.logstep:
+            return x + math.copysign( self.logstep, xn - x )
+        return xn
+
+    def resolution( self ):
+        # smallest x difference that shows through the noise
+        dy = self.yfloor()
+        if self.slope.abs_sum_x == 0 or self.slope.abs_sum_y == 0:
+            return 0
+        return dy * self.slope.abs_sum_x / self.slope.abs_sum_y
+
+    def signed_slope( self ):
+        # average slope size (steady) with the sign of the last secant
+        if self.dydx is None or self.slope.abs_sum_x == 0:
+            return None
+        m = self.slope.abs_sum_y / self.slope.abs_sum_x
+        if self.dydx < 0:
+            m = -m
+        return m
+
+    def sa_ready( self, dx ):
+        # step dx is lost in the noise, and there is a slope to freeze
+        # (not after a degenerate secant -- no sign)
+        return self.stochastic and self.signed_slope() is not None and abs( dx ) < self.resolution()
+
+    def sa_start( self, x ):
+        # freeze the slope and start decreasing steps from the newest estimate
+        self.sa_slope = self.signed_slope()
+        if self.sa_slope is None:
+            # nothing to freeze, stay with Newton-Raphson
+            return x
+        self.sa_n = 1
+        self.xsa = x
+        self.xbar = self.xsa # average of iterates
+        return self.xsa
+
+    def sa_step( self, y ):
+        # Robbins-Monro: gain 1/(n * slope)
+        # with the slope as gain, each x is the average of all the Newton estimates
+        # residual from the frozen line through the running average (the
+        # root estimate) -- just noise until the plant moves
+        if self.detect and self.cusum_add( y - self.sa_slope * ( self.xsa - self.xbar ) ):
+            return self.plant_changed( self.xsa )
+        self.xsa = self.bound.apply( self.xsa - y / ( self.sa_slope * self.sa_n ) )
+        self.sa_n += 1
+        self.xbar += ( self.xsa - self.xbar ) / self.sa_n
+        return self.xsa
+
+    def new_pair( self ):
+        # average and difference
+        x1 = .5 * ( self.xpair0 + self.xpair1 )
+        y1 = .5 * ( self.ypair0 + self.ypair1 )
+        dx = self.xpair0 - self.xpair1
+        dy = self.ypair0 - self.ypair1
+        
+        if dx == 0 or dy == 0:
+            self.dydx = None
+            # Need an arbitrary angle -- illegal slope otherwise
+            if abs(self.ypair0) < abs(self.ypair1):
+                x2 = self.xpair0 - self.ypair0/ self.slope.slope_average
+            else:
+                x2 = self.xpair1 - self.ypair1/ self.slope.slope_average
+
+        else:
+            self.slope.add_slope( dy, dx )
+            self.dydx = dy / dx
+            
+            # method
+            x2 = x1 - y1 * dx / dy
+
+        if self.trust and abs( x2 - x1 ) > self.radius:
+            # step limited to the trust region
+            x2 = x1 + math.copysign( self.radius, x2 - x1 )
+        x2 = self.log_limit( x1, x2 )
+        x2 = self.stall_check( x1, y1, x2 )
+        x2 = self.pin_check( x2, min( abs(self.ypair0), abs(self.ypair1) ) )
+        
+        # New bracket
+        x2 = self.chain.apply(x2)
+        return ( x2, self.bound.apply(.5 * (x1 + x2)) )
+
+    def yget( self, name ):
+        # measurement filter setting
+        return self.ychain0.get(name)
+
+    def yset( self, name, value ):
+        # measurement filter setting (both halves)
+        self.ychain0.set(name, value)
+        self.ychain1.set(name, value)
+
+    def calibrate( self, n = 20 ):
+        # measure noise from the next n readings at a fixed x
+        self.noise.clear()
+        self.calibrating = n
+        if n > 0:
+            self.first = True
+            # restart at xpair0 if the pair was partly measured
+            self.very_first = True
+            # readings are at xpair0 -- back to pairs from secant or
+            # stochastic steps, which expect them at another x
+            self.stepping = False
+            self.sa_n = 0
+
+    def find_delay( self, n = 20 ):
+        # estimate the dead time -- hold xpair0 for n readings, step to xpair1
+        # and count readings until the response leaves the noise
+        # delays below n/2 are found
+        self.delay_noise.clear()
+        self.finding = n
+        self.find_n = n
+        self.delay_ticks = None
+
+    def delay_step( self, value ):
+        if self.finding > 0:
+            # holding, second half is the steady response
+            self.finding -= 1
+            if self.finding < self.find_n // 2:
+                self.delay_noise.add( value )
+            if self.finding > 0:
+                return self.xpair0
+            self.delay_ticks = 0
+            return self.xpair1
+        band = max( 4 * self.delay_noise.std, self._error )
+        if abs( value - self.delay_noise.mean ) > band:
+            # response to the step
+            self.delay = self.delay_ticks
+        elif self.delay_ticks < self.find_n:
+            self.delay_ticks += 1
+            return self.xpair1
+        # found, or no visible response (delay left as it was)
+        self.delay_ticks = None
+        self.very_first = True
+        return self._next( value )
+
+    def calibrated( self ):
+        # noise estimate complete, compare to requested band
+        self.noise_floor = self.sigmas * self.noise.std
+        self.reachable = ( self.noise_floor <= self.request_error )
+        if self.widen:
+            self._error = max( self.request_error, self.noise_floor )
+        else:
+            self._error = self.request_error
+
+    @property
+    def target( self ):
+        return self._target
+        
+    @target.setter
+    def target( self, t ):
+        # Big jostle
+        avg = self.slope.slope_average # avoid second sign reversal
+        self.xpair0 = self.bound.apply( self.xpair0 + (t - self._target) / avg ) # deriv is essentially conversion factor
+        self.xpair1 = self.bound.apply( self.xpair1 + (t - self._target) / avg )
+        # New target
+        self._target = t
+        self.new_settings()
+
+    @property
+    def error( self ):
+        return self._error
+        
+    @error.setter
+    def error( self, e ):
+        self._error = e
+        self.request_error = e
+        if self.noise_floor is not None:
+            self.calibrated()
+        self.new_settings()
+
+    def xlimits( self ):
+        # bounds in the controller's own coordinate
+        if self.logx:
+            return _log( self.lo ), _log( self.hi )
+        return self.lo, self.hi
+
+    @property
+    def lo( self ):
+        return self.chain.get("_lo")
+        
+    @lo.setter
+    def lo( self, e ):
+        self.chain.set("_lo",e)
+        self.limits_changed()
+
+    @property
+    def hi( self ):
+        return self.chain.get("_hi")
+        
+    @hi.setter
+    def hi( self, e ):
+        self.chain.set("_hi",e)
+        self.limits_changed()
+
+    def limits_changed( self ):
+        # everything that depends on the range
+        lo, hi = self.xlimits()
+        self.bounded = ( lo is not None and hi is not None )
+        self.expand = self.expand_request and not self.bounded
+        self.xscale = _xscale( lo, hi, self.xscale )
+        self.slope.default = self.yscale / self.xscale
+        self.xpair0 = self.bound.apply( self.xpair0 )
+        self.xpair1 = self.bound.apply( self.xpair1 )
+        if self.xheld is not None:
+            x = self.bound.apply( self.xheld )
+            if x != self.xheld:
+                # held x is out of the new range -- move it now, and wait
+                # out the dead time again for its response
+                self.xheld = x
+                self.delay_wait = self.delay
+        self.new_settings()
+
+    def new_settings( self ):
+        # for any change in parameters
+        self.very_first = True
+        self.logy = self.logy_request and self._target > 0
+        self.inputalpha = 1.
+        self.sa_n = 0 # back to Newton-Raphson pairs
+        self.stepping = False
+        self.seeking = False
+        self.unreachable = False
+        self.side_sign = None
+        self.radius = .25 * self.xscale # trust region
+        self.lastbest = None
+        self.pin_side = None
+        self.pin_limit = self.pin_base
+        self.yhist = []
+        self.xneg = None # last x with y below the target
+        self.xpos = None # and above
+        self.damp = 1.
+        self.predict = None # line from the last pair (x, y, slope)
+        self.rscale = None # typical residual from it
+        self.cusum_hi = 0.
+        self.cusum_lo = 0.
+        self.cusum_n = 0
+        self.expanding = False
+        if self.expand:
+            self.expand_start()
+        # old measurements are relative to the old target
+        self.ychain0.reset()
+        self.ychain1.reset()
+        
+
+class NewtRap3(NewtRap):
+    # Three point version -- each set of 3 measurements gives the next estimate
+    # iqi=True fits x as a quadratic in y (inverse quadratic interpolation)
+    # and falls back to a secant when that fit can't be trusted
+    # iqi=False is the linear update from newtrap_12_3
+    # Uses bounds, x filter, scales and log modes from NewtRap, but not the
+    # pair-only features (y filters, calibration, stochastic, expansion, trust,
+    # secant, seek, escape, damping, change detection) -- they are off, and
+    # asking for them is an error rather than ignored
+    x3 = None
+    pair_only = ( 'yfilter', 'calibrate', 'stochastic', 'expand', 'trust', 'secant', 'seek', 'escape', 'damping', 'detect' )
+
+    def __init__(self, target=1, error = None, lo=None, hi=None, x0=None, iqi=True, **kwargs):
+        for k in self.pair_only:
+            if kwargs.pop( k, None ):
+                raise ValueError( "NewtRap3 does not support {}".format( k ) )
+        super().__init__( target, error, lo, hi, x0, expand=False, escape=False, damping=False, detect=False, **kwargs )
+        self.iqi = iqi
+        # start from the pair, with its midpoint
+        self.x3 = [ self.xpair1, self.bound.apply( .5 * ( self.xpair0 + self.xpair1 ) ), self.xpair0 ]
+        self.y3 = [ None, None, None ]
+        self.ypair0 = None
+        self.ypair1 = None
+
+    def _next( self, value ):
+        # prime the pump
+        if self.very_first:
+            # ignore value (no context)
+            self.very_first = False
+            self.stage = 0 # which part of the set?
+            return self.x3[0]
+
+        # value is from previous x
+        y = self.deviation( value )
+
+        if abs(y) <= self._error:
+            # within tolerances, repeat
+            self.y3[self.stage] = y
+
+            # Overtrain filters
+            self.chain.apply(self.x3[self.stage])
+
+            # (re)send good value
+            return self.x3[self.stage]
+
+        self.y3[self.stage] = y
+        if self.stage < 2:
+            self.stage += 1
+        else:
+            # set complete, calculate next set
+            self.new_set()
+            self.stage = 0
+        return self.x3[self.stage]
+
+    def new_set( self ):
+        x1, x2 = self.linear3()
+        if self.iqi:
+            xq = self.inverse_quadratic()
+            if xq is not None:
+                x2 = xq
+
+        # New set -- estimate first, then either side by a fraction of the step
+        x2 = self.chain.apply(x2) # filter and bounds
+        d = .2 * ( x2 - x1 )
+        self.x3 = [ x2, self.bound.apply( x2 - d ), self.bound.apply( x2 + d ) ]
+
+    def calibrate( self, n = 20 ):
+        if n > 0:
+            raise ValueError( "NewtRap3 does not support calibrate" )
+        super().calibrate( n )
+
+    def linear3( self ):
+        # center and newton estimate from the outer points' slope (newtrap_12_3)
+        # sort by x so lo, mid, hi have their meaning
+        ( xlo, ylo ), ( xmid, ymid ), ( xhi, yhi ) = sorted( zip( self.x3, self.y3 ) )
+        if xmid != xlo:
+            if xmid != xhi:
+                # all good
+                x1 = xmid
+                y1 = ymid
+                dx = xhi - xlo
+                dy = yhi - ylo
+                if dy * ( yhi - ymid ) < 0:
+                    # discordant y's
+                    y1 = .5 * ( yhi + ylo )
+            else:
+                # mid == hi
+                x1 = .5 * ( xlo + xmid )
+                y1 = .5 * ( ylo + ymid )
+                dx = xmid - xlo
+                dy = ymid - ylo
+        elif xmid != xhi:
+            # mid == lo
+            x1 = .5 * ( xmid + xhi )
+            y1 = .5 * ( ymid + yhi )
+            dx = xhi - xmid
+            dy = yhi - ymid
+        else:
+            # lo == mid == hi
+            x1 = xmid
+            y1 = ymid
+            dx = 0
+            dy = 0
+
+        if dx == 0 or dy == 0:
+            # degenerate -- need an arbitrary (historical) slope
+            self.dydx = None
+            return x1, x1 - y1 / self.slope.slope_average
+
+        self.slope.add_slope( dy, dx )
+        self.dydx = dy / dx
+        return x1, x1 - y1 * dx / dy
+
+    def inverse_quadratic( self ):
+        # x as a quadratic in y, evaluated at y = 0
+        # None if the fit is ill-conditioned
+        ( xa, ya ), ( xb, yb ), ( xc, yc ) = zip( self.x3, self.y3 )
+        yab = ya - yb
+        ybc = yb - yc
+        yca = yc - ya
+        span = max( abs(ya), abs(yb), abs(yc) )
+        if min( abs(yab), abs(ybc), abs(yca) ) <= 1e-12 * span:
+            # two y's (nearly) the same
+            return None
+        # y must be monotonic in x for x(y) to be a function
+        order = sorted( zip( self.x3, self.y3 ) )
+        if not ( order[0][1] < order[1][1] < order[2][1] or order[0][1] > order[1][1] > order[2][1] ):
+            return None
+        x = xa * yb * yc / ( yab * -yca ) + xb * ya * yc / ( -yab * ybc ) + xc * ya * yb / ( yca * -ybc )
+        # don't trust a big extrapolation
+        lo = min( self.x3 )
+        hi = max( self.x3 )
+        if x < lo - 2 * ( hi - lo ) or x > hi + 2 * ( hi - lo ):
+            return None
+        return x
+
+    @NewtRap.target.setter
+    def target( self, t ):
+        # Big jostle
+        avg = self.slope.slope_average # avoid second sign reversal
+        self.x3 = [ self.bound.apply( x + (t - self._target) / avg ) for x in self.x3 ]
+        # New target
+        self._target = t
+        self.new_settings()
+
+    def new_settings( self ):
+        super().new_settings()
+        if self.x3 is not None:
+            # bounds may have changed
+            self.x3 = [ self.bound.apply( x ) for x in self.x3 ]
@@ -0,0 +1,435 @@
+#!/bin/python3
+
+# Newton-Raphon method process control -- a bank of many controllers
+# Same pair method as newtrap_14.NewtRap, stepped for all controllers at once
+#
+# Each controller has its own target, error, lo and hi (both bounds needed)
+# State lives in flat arrays, one entry per controller, so it can sit in
+# any buffer -- plain numpy, shared memory (ShardedBank), a file (MappedBank)
+#
+# Matches newtrap_14.NewtRap( target, error, lo, hi, escape=False, damping=False, detect=False )
+# call for call -- plain Newton-Raphson pairs, input filters, bounds
+#
+# Sparse updates -- next( values, idx ) steps only controllers idx, the
+# ones measured this tick. With hold=True controllers repeating an x in
+# band are skipped until an out of band reading arrives, so the cost of a
+# tick follows the activity, not the size of the bank
+#
+# Storage is 8 bytes a number (dtype=np.float64, 145 bytes a controller)
+# or 4 (np.float32, 73 bytes) -- against about 3k for a NewtRap object
+# Phase flags are bits of one byte
+#
+# float32 precision (about 7 digits) -- the error band has to stay well
+# above the spacing of floats at the target and at x:
+#   error / |target| >= 1e-5  same steps as float64
+#   1e-6 to 1e-7              most settle, some take many more steps
+#   below 1e-7                band can't be resolved, x jitters around it
+# (noise free x^2, newtrap_test29.py) -- use float64 for tight bands
+#
+# needs numpy
+#
+# Usage:
+# import newtrap_bank
+# bank = newtrap_bank.Bank( 1000, target=targets, error=.01, lo=0, hi=10 )
+#
+# y = np.zeros(1000)
+# while True:
+#     x = bank.next(y)
+#     y = my_processes(x)
+
+import numpy as np
+
+import os
+from multiprocessing import shared_memory
+import multiprocessing
+
+# state arrays -- name: type (float is the bank's dtype)
+_fields = {
+    "target":     float,
+    "error":      float,
+    "lo":         float,
+    "hi":         float,
+    "default":    float, # slope before any is seen
+    "xpair0":     float,
+    "xpair1":     float,
+    "ypair0":     float,
+    "ypair1":     float,
+    "lasty0":     float, # y filter memory, NaN for none
+    "lasty1":     float,
+    "lastx":      float, # x filter memory, NaN for none
+    "inputalpha": float,
+    "abs_sum_y":  float, # decaying average slope
+    "abs_sum_x":  float,
+    "sign":       float, # alternating sign for the fallback slope
+    "flags":      np.uint8, # phase bits, below
+    "value":      float, # in -- measurements
+    "x":          float, # out -- settings
+    }
+
+# flags bits
+_very_first = 1 # next call only primes the pump
+_first = 2 # next value is from xpair0
+_holding = 4 # last value was in band, x repeated
+
+inputdecay = .99
+
+def _dtype( t, dtype ):
+    return np.dtype( dtype if t is float else t )
+
+def _layout( n, dtype=np.float64 ):
+    # byte offset of each array in one block, and the total size
+    offsets = {}
+    size = 0
+    for name, t in _fields.items():
+        size = -( -size // 8 ) * 8 # 8 byte alignment
+        offsets[name] = size
+        size += n * _dtype( t, dtype ).itemsize
+    return offsets, max( size, 1 )
+
+class Bank():
+    # n controllers, stepped together
+    # buffer (optional) holds all the state, in _layout order
+    # dtype is np.float64 or np.float32 (half the memory, see precision above)
+    # hold=True skips controllers holding in band that read in band again
+    def __init__( self, n, target=1, error=None, lo=0, hi=1, buffer=None, dtype=np.float64, hold=False ):
+        self.n = n
+        self.dtype = np.dtype( dtype )
+        self.hold = hold
+        if buffer is None:
+            buffer = bytearray( _layout( n, dtype )[1] )
+        self.bind( buffer )
+        self.settings( slice(None), target, error, lo, hi )
+
+    def bind( self, buffer ):
+        # state arrays as views into buffer
+        self.buffer = buffer
+        offsets = _layout( self.n, self.dtype )[0]
+        for name, t in _fields.items():
+            setattr( self, name, np.ndarray( self.n, dtype=_dtype( t, self.dtype ), buffer=buffer, offset=offsets[name] ) )
+
+    def settings( self, s, target, error, lo, hi ):
+        # (re)start controllers s, as a new NewtRap would
+        self.target[s] = target
+        t = self.target[s]
+        if error is None:
+            error = np.where( t == 0, .01, .01 * np.abs( t ) )
+        self.error[s] = np.abs( error )
+        self.lo[s] = np.minimum( lo, hi )
+        self.hi[s] = np.maximum( lo, hi )
+        lo = self.lo[s]
+        hi = self.hi[s]
+        xscale = np.where( hi > lo, hi - lo, 1. )
+        yscale = np.where( t != 0, np.abs( t ), 100 * self.error[s] )
+        self.default[s] = yscale / xscale
+        d = .1 * xscale
+        self.xpair0[s] = np.clip( .6 * lo + .4 * hi - d, lo, hi )
+        self.xpair1[s] = np.clip( .4 * lo + .6 * hi + d, lo, hi )
+        self.ypair0[s] = np.nan
+        self.ypair1[s] = np.nan
+        self.lastx[s] = np.nan
+        self.abs_sum_y[s] = 0.
+        self.abs_sum_x[s] = 0.
+        self.sign[s] = -1.
+        self.flags[s] = 0
+        self.new_settings( s )
+
+    def new_settings( self, s ):
+        # for any change in parameters
+        self.flags[s] |= _very_first
+        self.flags[s] &= 0xff ^ _holding
+        self.inputalpha[s] = 1.
+        self.lasty0[s] = np.nan
+        self.lasty1[s] = np.nan
+
+    def slope_average( self, i ):
+        # for index array i -- flips the sign on every call, as _slope does
+        self.sign[i] = -self.sign[i]
+        sx = self.abs_sum_x[i]
+        s = np.where( sx != 0, self.abs_sum_y[i] / np.where( sx != 0, sx, 1. ), self.default[i] )
+        return self.sign[i] * s
+
+    def set_target( self, i, t ):
+        # big jostle, then restart -- as the NewtRap target setter
+        i = np.arange( self.n )[i]
+        avg = self.slope_average( i )
+        dt = ( t - self.target[i] ) / avg
+        # bounds, as the setter's bound.apply
+        self.xpair0[i] = np.clip( self.xpair0[i] + dt, self.lo[i], self.hi[i] )
+        self.xpair1[i] = np.clip( self.xpair1[i] + dt, self.lo[i], self.hi[i] )
+        self.target[i] = t
+        self.new_settings( i )
+
+    def next( self, values, idx=None ):
+        # values is the measurement array -- for all controllers, or just
+        # for controllers idx (index array), the only ones stepped
+        # the others had no measurement, as not calling NewtRap.next
+        if idx is None:
+            self.value[:] = values
+            self.step( self.active( slice(None) ) )
+        else:
+            idx = np.asarray( idx )
+            self.value[idx] = values
+            self.step( self.active( idx ) )
+        return self.x
+
+    def active( self, s ):
+        # index array of controllers s (slice or index array) that need a step
+        # with hold, ones repeating an x in band that read in band again
+        # are left alone -- NewtRap would only refresh the y filter memory
+        # with the new reading and age the input filter
+        if isinstance( s, slice ):
+            i = np.arange( *s.indices( self.n ) )
+        else:
+            i = s
+        if self.hold:
+            h = ( self.flags[i] & _holding ) != 0
+            k = i[h]
+            h[h] = np.abs( self.value[k] - self.target[k] ) <= self.error[k]
+            i = i[~h]
+        return i
+
+    def step( self, i ):
+        # controllers i (index array): self.value in, self.x out
+        vf = ( self.flags[i] & _very_first ) != 0
+        j = i[vf]
+        # prime the pump
+        self.flags[j] = _first # very_first and holding cleared
+        self.x[j] = self.xpair0[j]
+        i = i[~vf]
+
+        y = self.value[i] - self.target[i]
+        perfect = np.abs( y ) <= self.error[i]
+        # weight of a new value, as NewtRap at one period a call
+        alpha = self.inputalpha[i]
+        first = ( self.flags[i] & _first ) != 0
+
+        # from xpair0
+        self.inputalpha[i[first]] *= inputdecay
+        self.half( i[first], y[first], perfect[first], alpha[first], self.xpair0, self.xpair1, self.ypair0, self.lasty0 )
+        self.flags[i[first & ~perfect]] &= 0xff ^ _first
+
+        # from xpair1
+        k = ~first
+        done = self.half( i[k], y[k], perfect[k], alpha[k], self.xpair1, None, self.ypair1, self.lasty1 )
+        k = i[k][done]
+        self.new_pair( k, alpha[~first][done] )
+        self.flags[k] |= _first
+        self.x[k] = self.xpair0[k]
+
+    def half( self, i, y, perfect, alpha, xthis, xnext, ypair, lasty ):
+        # one half of the pair measured, returns the ones that moved on
+        # within tolerances -- repeat, overtrain the x filter
+        p = i[perfect]
+        self.flags[p] |= _holding
+        ypair[p] = y[perfect]
+        lasty[p] = y[perfect]
+        self.lastx[p] = xthis[p]
+        self.x[p] = xthis[p]
+        # otherwise filter y
+        q = i[~perfect]
+        self.flags[q] &= 0xff ^ _holding
+        yq = y[~perfect]
+        ly = lasty[q]
+        a = alpha[~perfect]
+        yq = np.where( np.isnan( ly ), yq, a * yq + ( 1 - a ) * ly )
+        ypair[q] = yq
+        lasty[q] = yq
+        if xnext is not None:
+            self.x[q] = xnext[q]
+        return ~perfect
+
+    def new_pair( self, i, alpha ):
+        # Newton-Raphson from the pair, for controllers i
+        x0 = self.xpair0[i]
+        x1 = self.xpair1[i]
+        y0 = self.ypair0[i]
+        y1 = self.ypair1[i]
+        xm = .5 * ( x0 + x1 )
+        ym = .5 * ( y0 + y1 )
+        dx = x0 - x1
+        dy = y0 - y1
+        bad = ( dx == 0 ) | ( dy == 0 )
+
+        x2 = np.empty_like( xm )
+        # method
+        g = ~bad
+        gi = i[g]
+        self.abs_sum_y[gi] = .99999 * self.abs_sum_y[gi] + np.abs( dy[g] )
+        self.abs_sum_x[gi] = .99999 * self.abs_sum_x[gi] + np.abs( dx[g] )
+        x2[g] = xm[g] - ym[g] * dx[g] / dy[g]
+        # need an arbitrary angle -- illegal slope otherwise
+        bi = i[bad]
+        avg = self.slope_average( bi )
+        b0 = np.abs( y0[bad] ) < np.abs( y1[bad] )
+        x2[bad] = np.where( b0, x0[bad] - y0[bad] / avg, x1[bad] - y1[bad] / avg )
+
+        # x filter, then bounds
+        lx = self.lastx[i]
+        self.lastx[i] = x2
+        x2 = np.where( np.isnan( lx ), x2, alpha * x2 + ( 1 - alpha ) * lx )
+        lo = self.lo[i]
+        hi = self.hi[i]
+        x2 = np.maximum( np.minimum( x2, hi ), lo )
+        self.xpair0[i] = x2
+        self.xpair1[i] = np.maximum( np.minimum( .5 * ( xm + x2 ), hi ), lo )
+
+def _index_offset( n, dtype ):
+    # ShardedBank's index array goes after the bank's own state
+    return -( -_layout( n, dtype )[1] // 8 ) * 8
+
+def _worker( name, n, dtype, hold, s, start, done, stop, count ):
+    # one process -- step slice s of the shared bank each tick
+    # count < 0: all controllers measured, else the first count entries of
+    # the shared index array (sorted) are the ones measured
+    shm = shared_memory.SharedMemory( name=name )
+    bank = Bank.__new__( Bank )
+    bank.n = n
+    bank.dtype = dtype
+    bank.hold = hold
+    bank.bind( shm.buf )
+    index = np.ndarray( n, dtype=np.int64, buffer=shm.buf, offset=_index_offset( n, dtype ) )
+    while True:
+        start.wait()
+        if stop.value:
+            break
+        k = count.value
+        if k < 0:
+            bank.step( bank.active( s ) )
+        else:
+            i = index[:k]
+            i = i[ np.searchsorted( i, s.start ) : np.searchsorted( i, s.stop ) ]
+            bank.step( bank.active( i ) )
+        done.wait()
+    del bank, index
+    shm.close()
+
+class ShardedBank(Bank):
+    # Bank in shared memory, split into 'workers' slices, one process each
+    # measurements are written into the shared 'value' array and settings
+    # read from the shared 'x' array -- nothing is pickled per tick
+    # next( values, idx ) as Bank: the indices go to the workers sorted,
+    # through a shared array, each takes its own range
+    def __init__( self, n, target=1, error=None, lo=0, hi=1, workers=2, dtype=np.float64, hold=False ):
+        self.shm = shared_memory.SharedMemory( create=True, size=_index_offset( n, dtype ) + 8 * n )
+        super().__init__( n, target, error, lo, hi, buffer=self.shm.buf, dtype=dtype, hold=hold )
+        self.index = np.ndarray( n, dtype=np.int64, buffer=self.shm.buf, offset=_index_offset( n, self.dtype ) )
+        ctx = multiprocessing.get_context( "fork" )
+        self.start = ctx.Barrier( workers + 1 )
+        self.done = ctx.Barrier( workers + 1 )
+        self.stop = ctx.Value( 'b', 0 )
+        self.count = ctx.Value( 'q', -1, lock=False ) # measured this tick, -1 for all
+        edges = [ n * w // workers for w in range( workers + 1 ) ]
+        self.slices = [ slice( edges[w], edges[w+1] ) for w in range( workers ) ]
+        self.procs = [ ctx.Process( target=_worker, args=( self.shm.name, n, self.dtype, self.hold, s, self.start, self.done, self.stop, self.count ), daemon=True ) for s in self.slices ]
+        for p in self.procs:
+            p.start()
+
+    def next( self, values, idx=None ):
+        if idx is None:
+            self.value[:] = values
+            self.count.value = -1
+        else:
+            idx = np.asarray( idx )
+            self.value[idx] = values
+            k = len( idx )
+            self.index[:k] = np.sort( idx )
+            self.count.value = k
+        self.start.wait() # workers step their slices
+        self.done.wait()
+        return self.x
+
+    def close( self ):
+        # stop the workers and free the shared block
+        self.stop.value = 1
+        self.start.wait()
+        for p in self.procs:
+            p.join()
+        for f in _fields:
+            setattr( self, f, None )
+        self.index = None
+        self.buffer = None
+        self.shm.close()
+        self.shm.unlink()
+
+_magic = 0x4e65777452617042 # "NewtRapB"
+
+class MappedBank(Bank):
+    # Bank kept in a file (numpy.memmap) -- survives a crash or a restart
+    # File: header (magic, n, generation, float size) then two copies of the state
+    # Each update works on the spare copy, flushes it, and only then
+    # advances the generation -- the header write is what commits it
+    # A kill at any point leaves the last committed copy intact
+    #
+    # MappedBank( filename, n, target ... ) creates the file if needed,
+    # otherwise the state in the file is used as is (n checked if given)
+    # creation uses filename.new as scratch
+    def __init__( self, filename, n=None, target=1, error=None, lo=0, hi=1, dtype=np.float64, hold=False ):
+        self.hold = hold
+        if os.path.exists( filename ):
+            self.header = np.memmap( filename, dtype=np.int64, mode='r+', shape=(4,) )
+            if self.header[0] != _magic:
+                raise ValueError( "{} is not a NewtRap bank file".format( filename ) )
+            if n is not None and n != self.header[1]:
+                raise ValueError( "{} holds {} controllers, not {}".format( filename, self.header[1], n ) )
+            self.n = int( self.header[1] )
+            self.dtype = np.dtype( { 4: np.float32, 8: np.float64 }[ int( self.header[3] ) ] )
+            self.map( filename, 'r+' )
+            self.bind( self.regions[ self.header[2] % 2 ] )
+        else:
+            # built under another name and renamed into place once complete
+            # -- a kill during creation leaves no half made bank file
+            # (the mapping follows the file through the rename)
+            self.n = n
+            self.dtype = np.dtype( dtype )
+            self.map( filename + ".new", 'w+' )
+            self.bind( self.regions[0] )
+            self.settings( slice(None), target, error, lo, hi )
+            self.header[:] = ( _magic, n, 0, self.dtype.itemsize )
+            self.mm.flush()
+            os.replace( filename + ".new", filename )
+
+    def map( self, filename, mode ):
+        # whole file, header and both copies
+        size = -( -_layout( self.n, self.dtype )[1] // 64 ) * 64
+        self.mm = np.memmap( filename, dtype=np.uint8, mode=mode, shape=( 64 + 2 * size, ) )
+        self.header = np.ndarray( 4, dtype=np.int64, buffer=self.mm )
+        self.regions = [ self.mm[64:64+size], self.mm[64+size:] ]
+
+    @property
+    def generation( self ):
+        # updates committed so far
+        return int( self.header[2] )
+
+    def begin( self ):
+        # copy the committed state to the spare and work there
+        g = self.generation
+        spare = self.regions[ ( g + 1 ) % 2 ]
+        spare[:] = self.regions[ g % 2 ]
+        self.bind( spare )
+
+    def commit( self ):
+        # data first, then the switch
+        self.mm.flush()
+        self.header[2] += 1
+        self.mm.flush()
+
+    def set_target( self, i, t ):
+        self.begin()
+        super().set_target( i, t )
+        self.commit()
+
+    def next( self, values, idx=None ):
+        # x is a view of the file -- copy it to keep it past the next call
+        self.begin()
+        super().next( values, idx )
+        self.commit()
+        return self.x
+
+    def close( self ):
+        for f in _fields:
+            setattr( self, f, None )
+        self.buffer = None
+        self.regions = None
+        self.header = None
+        self.mm.flush()
+        del self.mm
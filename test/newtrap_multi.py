@@ -0,0 +1,319 @@
+#!/bin/python3
+
+# Newton-Raphon method process control -- several inputs and outputs
+# Find the input vector 'x' that gives an output vector closest to target
+#
+# Same idea as newtrap.NewtRap, but the derivative is a matrix (Jacobian)
+# one input per output, coupled any which way
+#
+# There is (optional) bounding limits on each x: 'lo' and 'hi' (lists, None for none)
+# you can start with an (optional) initial guess 'x0'
+# You can set the allowable error 'error' margin (2-sided), one per output or one for all
+#
+# needs no other modules (besides newtrap_14 for the scales)
+#
+# Method:
+# Newton-Raphson for a vector zero:
+# x1 = x0 - J^-1 f(x0)
+#
+# J starts from finite difference probes, one input at a time (n+1 measurements)
+# after that every step updates J with a Broyden rank one correction:
+# J += ( dy - J dx ) dx' / ( dx' dx ) -- dx in units of each input's scale
+# If J goes singular, probe again
+#
+# Usage:
+# import newtrap_multi
+# nr = newtrap_multi.NewtRapN( [ 1, 2 ], error=.01, lo=[0,0], hi=[10,10] )
+#
+# y = [ 0, 0 ]
+# while True:
+#     x = nr.next(y)
+#     y = my_process(x)
+
+import random
+
+import newtrap_14 as newtrap
+
+def _solve( A, b ):
+    # Gaussian elimination with partial pivoting
+    # None if A is (numerically) singular
+    n = len(b)
+    M = [ list( A[i] ) + [ b[i] ] for i in range(n) ]
+    big = max( abs(v) for row in A for v in row )
+    if big == 0:
+        return None
+    for c in range(n):
+        p = max( range( c, n ), key = lambda r: abs( M[r][c] ) )
+        if abs( M[p][c] ) <= 1e-12 * big:
+            return None
+        M[c], M[p] = M[p], M[c]
+        for r in range( c+1, n ):
+            f = M[r][c] / M[c][c]
+            if f != 0:
+                for k in range( c, n+1 ):
+                    M[r][k] -= f * M[c][k]
+    x = [ 0. ] * n
+    for c in range( n-1, -1, -1 ):
+        s = M[c][n] - sum( M[c][k] * x[k] for k in range( c+1, n ) )
+        x[c] = s / M[c][c]
+    return x
+
+class NewtRapN():
+    # Newton-Raphson with a Broyden Jacobian for coupled inputs and outputs
+    # One call per measurement of all outputs (returns the next x vector)
+    def __init__(self, target, error = None, lo=None, hi=None, x0=None):
+        self._target = list( target )
+        n = self.n = len( self._target )
+
+        if error is None:
+            self._error = [ .01 * abs(t) if t != 0 else .01 for t in self._target ]
+        elif isinstance( error, ( list, tuple ) ):
+            self._error = [ abs(e) for e in error ]
+        else:
+            self._error = [ abs(error) ] * n
+
+        # bounds, sorted per input
+        self.lo = self.vector( lo )
+        self.hi = self.vector( hi )
+        for i in range(n):
+            if self.lo[i] is not None and self.hi[i] is not None and self.lo[i] > self.hi[i]:
+                self.lo[i], self.hi[i] = self.hi[i], self.lo[i]
+        x0 = self.vector( x0 )
+
+        # characteristic scale of each input
+        self.xscale = [ newtrap._xscale( self.lo[i], self.hi[i], x0[i] ) for i in range(n) ]
+
+        # start -- x0, else the middle of the range, else 1
+        x = []
+        for i in range(n):
+            if x0[i] is not None:
+                x.append( x0[i] )
+            elif self.lo[i] is not None and self.hi[i] is not None:
+                x.append( .5 * ( self.lo[i] + self.hi[i] ) )
+            elif self.lo[i] is not None:
+                x.append( self.lo[i] + .1 * self.xscale[i] )
+            elif self.hi[i] is not None:
+                x.append( self.hi[i] - .1 * self.xscale[i] )
+            else:
+                x.append( 1. )
+        self.x = self.clamp( x )
+
+        self.J = None # Jacobian estimate, J[output][input]
+        self.probe_size = .1 # probe step, fraction of xscale
+        self.probes = 0 # measurements spent on finite differences
+        self.broyden = 0 # rank one updates so far
+        self.new_settings()
+
+    def vector( self, v ):
+        # list of n values (or None's) from a list, a scalar, or None
+        if isinstance( v, ( list, tuple ) ):
+            return list( v )
+        return [ v ] * self.n
+
+    def clamp( self, x ):
+        # per input bounds
+        x = list( x )
+        for i in range( self.n ):
+            if self.lo[i] is not None and x[i] < self.lo[i]:
+                x[i] = self.lo[i]
+            if self.hi[i] is not None and x[i] > self.hi[i]:
+                x[i] = self.hi[i]
+        return x
+
+    def next( self, values ):
+        # values are the outputs measured at the last x returned
+        if self.very_first:
+            # ignore values (no context)
+            self.very_first = False
+            if self.J is None:
+                self.probe_start()
+            return list( self.x )
+
+        y = [ values[i] - self._target[i] for i in range( self.n ) ]
+
+        if self.probing is not None:
+            return self.probe_step( y )
+
+        if all( abs( y[i] ) <= self._error[i] for i in range( self.n ) ):
+            # within tolerances, repeat
+            self.xlast, self.ylast = list( self.x ), y
+            return list( self.x )
+
+        if self.ylast is not None:
+            self.update( y )
+        return self.step( y )
+
+    def probe_start( self ):
+        # finite differences about the current x, one input at a time
+        self.probing = -1 # base point first
+        self.J = [ [ 0. ] * self.n for i in range( self.n ) ]
+
+    def probe_step( self, y ):
+        i = self.probing
+        self.probes += 1
+        if i < 0:
+            # base point measured
+            self.xbase, self.ybase = list( self.x ), y
+        else:
+            # the step actually taken (clamped)
+            d = self.x[i] - self.xbase[i]
+            if d != 0:
+                for r in range( self.n ):
+                    self.J[r][i] = ( y[r] - self.ybase[r] ) / d
+        i += 1
+        if i < self.n:
+            # next input, towards the side with more room, clamped
+            self.probing = i
+            self.x = list( self.xbase )
+            d = self.probe_size * self.xscale[i]
+            up = None if self.hi[i] is None else self.hi[i] - self.x[i]
+            down = None if self.lo[i] is None else self.x[i] - self.lo[i]
+            if up is not None and ( down is None or down > up ):
+                d = -d
+            self.x[i] += d
+            self.x = self.clamp( self.x )
+            return list( self.x )
+        # Jacobian complete, Newton-Raphson from the base point
+        self.probing = None
+        self.x = self.xbase
+        self.xlast, self.ylast = self.xbase, self.ybase
+        return self.step( self.ybase )
+
+    def update( self, y ):
+        # Broyden rank one correction from the last step
+        dx = [ self.x[i] - self.xlast[i] for i in range( self.n ) ]
+        dy = [ y[i] - self.ylast[i] for i in range( self.n ) ]
+        dd = sum( ( dx[i] / self.xscale[i] ) ** 2 for i in range( self.n ) )
+        if dd < 1e-20:
+            return
+        for r in range( self.n ):
+            miss = dy[r] - sum( self.J[r][k] * dx[k] for k in range( self.n ) )
+            for k in range( self.n ):
+                self.J[r][k] += miss * dx[k] / self.xscale[k] ** 2 / dd
+        self.broyden += 1
+
+    def step( self, y ):
+        # Newton-Raphson step from the current x, clamped
+        dx = _solve( self.J, [ -v for v in y ] )
+        self.xlast, self.ylast = list( self.x ), y
+        if dx is None:
+            # singular -- measure the Jacobian again, with wider probes
+            # in case this is a flat spot
+            self.probe_size = min( 2 * self.probe_size, 1. )
+            self.probe_start()
+            return self.probe_step( y )
+        self.probe_size = .1
+        self.x = self.clamp( [ self.x[i] + dx[i] for i in range( self.n ) ] )
+        return list( self.x )
+
+    @property
+    def target( self ):
+        return self._target
+
+    @target.setter
+    def target( self, t ):
+        # keep the Jacobian, restart from the current x
+        self._target = list( t )
+        self.new_settings()
+
+    @property
+    def error( self ):
+        return self._error
+
+    @error.setter
+    def error( self, e ):
+        self._error = [ abs(v) for v in self.vector( e ) ]
+        self.new_settings()
+
+    def new_settings( self ):
+        # for any change in parameters
+        self.very_first = True
+        self.probing = None
+        self.xlast = None
+        self.ylast = None
+
+class SpsaN(NewtRapN):
+    # Simultaneous perturbation stochastic approximation (Spall)
+    # Minimizes the squared error in band units, sum( ((y-target)/error)^2 )
+    # Two measurements per iteration whatever the number of inputs,
+    # x + c_k d and x - c_k d for a random +/-1 vector d, c_k = c / (k+1)^.101
+    # Step size from the loss (Polyak, the loss we want is 0) rather than a
+    # fixed gain sequence, so there is nothing to tune for the plant's scale
+    # Same bounds, scales and error band as NewtRapN -- when the average
+    # of the two outputs is in the band, x itself is measured, and held if
+    # it is in the band
+    def __init__(self, target, error = None, lo=None, hi=None, x0=None, c=.01, gain=2.):
+        self.c = c # perturbation, fraction of xscale
+        self.gain = gain # times the Polyak step (2 aims at the zero along the step)
+        super().__init__( target, error, lo, hi, x0 )
+
+    def perturb( self ):
+        # x + c_k d first
+        self.ck = self.c / ( self.k + 1 ) ** .101
+        self.delta = [ random.choice( ( -1, 1 ) ) for i in range( self.n ) ]
+        self.xp = self.clamp( [ self.x[i] + self.ck * self.delta[i] * self.xscale[i] for i in range( self.n ) ] )
+        self.xn = self.clamp( [ self.x[i] - self.ck * self.delta[i] * self.xscale[i] for i in range( self.n ) ] )
+        self.phase = 1
+        return list( self.xp )
+
+    def inband( self, y ):
+        return all( abs( y[i] ) <= self._error[i] for i in range( self.n ) )
+
+    def next( self, values ):
+        # values are the outputs measured at the last x returned
+        if self.very_first:
+            # ignore values (no context)
+            self.very_first = False
+            return self.perturb()
+
+        y = [ values[i] - self._target[i] for i in range( self.n ) ]
+
+        if self.phase == 0:
+            # x itself measured
+            if self.inband( y ):
+                # within tolerances, repeat
+                return list( self.x )
+            return self.perturb()
+
+        if self.phase == 1:
+            # x + c_k d measured
+            self.yp = y
+            self.phase = 2
+            return list( self.xn )
+
+        # x - c_k d measured, average is about the outputs at x
+        ym = [ .5 * ( self.yp[i] + y[i] ) for i in range( self.n ) ]
+        if self.inband( ym ):
+            # x is probably in the band already -- check it
+            self.phase = 0
+            return list( self.x )
+
+        # gradient, per unit of xscale
+        lp = sum( ( self.yp[i] / self._error[i] ) ** 2 for i in range( self.n ) )
+        ln = sum( ( y[i] / self._error[i] ) ** 2 for i in range( self.n ) )
+        g = []
+        for i in range( self.n ):
+            d = ( self.xp[i] - self.xn[i] ) / self.xscale[i]
+            g.append( ( lp - ln ) / d if d != 0 else 0. )
+
+        # |gradient|^2 from a running average of the directional derivative
+        # -- a single estimate can be near 0 and throw x anywhere
+        gd = ( lp - ln ) / ( 2 * self.ck )
+        if self.g2 is None:
+            self.g2 = gd * gd
+        else:
+            self.g2 = .9 * self.g2 + .1 * gd * gd
+        if self.g2 > 0:
+            # each estimate has about n times the gradient's square
+            lm = sum( ( ym[i] / self._error[i] ) ** 2 for i in range( self.n ) )
+            ak = self.gain * lm / ( self.n * self.g2 )
+            self.x = self.clamp( [ self.x[i] - ak * g[i] * self.xscale[i] for i in range( self.n ) ] )
+        self.k += 1
+        return self.perturb()
+
+    def new_settings( self ):
+        # for any change in parameters
+        super().new_settings()
+        self.phase = 0
+        self.k = 0
+        self.g2 = None
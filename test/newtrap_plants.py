@@ -0,0 +1,147 @@
+#!/bin/python3
+
+# Newton-Raphon method process control -- plant models for the tests
+#
+# Each model is n plants at once: parameters are arrays (or one value for
+# all), and a call takes an array of x and gives the array of outputs
+#   y = plant( x )        -- x for all n plants
+#   y = plant( x, idx )   -- x for plants idx only (as bank.next( values, idx ))
+# plant.f( x, idx ) is the same without noise
+#
+# noise -- uniform on [0, noise) like the scripts' S*random.random(),
+# or normal with sigma noise (normal=True), from a seeded generator so a
+# run can be repeated
+#
+# Static:  Polynomial, Saturating, PowerLaw
+# Memory:  Hysteretic (backlash), Lag (first order), Drifting
+#          -- state per plant, changed only for the plants called
+#
+# needs numpy
+#
+# Usage:
+# import newtrap_plants
+# plant = newtrap_plants.Polynomial( [ 0, 0, 1 ], n=1000, noise=1. ) # x^2 + noise
+# y = np.zeros(1000)
+# while True:
+#     x = bank.next(y)
+#     y = plant(x)
+
+import numpy as np
+
+def _param( p, n ):
+    # one value per plant
+    return np.broadcast_to( np.asarray( p, dtype=np.float64 ), (n,) ).copy()
+
+def _at( a, idx ):
+    return a if idx is None else a[idx]
+
+class Plant():
+    # base -- noise and calling, models give f( x, idx )
+    def __init__(self, n=1, noise=0., normal=False, seed=0):
+        self.n = n
+        self.noise = _param( noise, n )
+        self.normal = normal
+        self.rng = np.random.default_rng( seed )
+
+    def __call__( self, x, idx=None ):
+        y = self.f( np.asarray( x, dtype=np.float64 ), idx )
+        noise = _at( self.noise, idx )
+        if self.normal:
+            return y + noise * self.rng.standard_normal( len( y ) )
+        return y + noise * self.rng.random( len( y ) )
+
+    def f( self, x, idx=None ):
+        return x
+
+class Polynomial(Plant):
+    # sum c[k] x^k -- c[k] per plant or one for all
+    def __init__(self, c, n=1, **kwargs):
+        super().__init__( n, **kwargs )
+        self.c = [ _param( ck, n ) for ck in c ]
+
+    def f( self, x, idx=None ):
+        # Horner
+        y = np.zeros_like( x )
+        for ck in reversed( self.c ):
+            y = y * x + _at( ck, idx )
+        return y
+
+class Saturating(Plant):
+    # offset + span tanh( (x - center) / width ) -- levels off both ways
+    def __init__(self, span=1., center=0., width=1., offset=0., n=1, **kwargs):
+        super().__init__( n, **kwargs )
+        self.span = _param( span, n )
+        self.center = _param( center, n )
+        self.width = _param( width, n )
+        self.offset = _param( offset, n )
+
+    def f( self, x, idx=None ):
+        return _at( self.offset, idx ) + _at( self.span, idx ) * np.tanh( ( x - _at( self.center, idx ) ) / _at( self.width, idx ) )
+
+class PowerLaw(Plant):
+    # a |x|^p + b, odd in x (sign kept) -- steep or flat near 0
+    def __init__(self, a=1., p=2., b=0., n=1, **kwargs):
+        super().__init__( n, **kwargs )
+        self.a = _param( a, n )
+        self.p = _param( p, n )
+        self.b = _param( b, n )
+
+    def f( self, x, idx=None ):
+        return _at( self.a, idx ) * np.sign( x ) * np.abs( x ) ** _at( self.p, idx ) + _at( self.b, idx )
+
+class Hysteretic(Plant):
+    # backlash (play) of width w in front of gain * z + offset
+    # z only moves once x pushes it from one side of the gap
+    def __init__(self, w=1., gain=1., offset=0., n=1, **kwargs):
+        super().__init__( n, **kwargs )
+        self.w = _param( w, n )
+        self.gain = _param( gain, n )
+        self.offset = _param( offset, n )
+        self.z = np.zeros( n ) # play position
+
+    def f( self, x, idx=None ):
+        h = .5 * _at( self.w, idx )
+        z = np.clip( _at( self.z, idx ), x - h, x + h )
+        if idx is None:
+            self.z[:] = z
+        else:
+            self.z[idx] = z
+        return _at( self.gain, idx ) * z + _at( self.offset, idx )
+
+class Lag(Plant):
+    # plant (noise free) seen through a first order lag
+    # each call is dt later, time constant tau (same units)
+    def __init__(self, plant, tau=1., dt=1., n=None, **kwargs):
+        super().__init__( plant.n if n is None else n, **kwargs )
+        self.plant = plant
+        self.keep = _param( np.exp( -dt / np.asarray( tau, dtype=np.float64 ) ), self.n )
+        self.y = np.full( self.n, np.nan ) # lagged output, NaN before the first call
+
+    def f( self, x, idx=None ):
+        u = self.plant.f( x, idx )
+        y = _at( self.y, idx )
+        k = _at( self.keep, idx )
+        y = np.where( np.isnan( y ), u, k * y + ( 1 - k ) * u )
+        if idx is None:
+            self.y[:] = y
+        else:
+            self.y[idx] = y
+        return y
+
+class Drifting(Plant):
+    # plant (noise free) plus an offset that moves every call:
+    # rate (steady) plus a random walk of sigma walk (seeded)
+    def __init__(self, plant, rate=0., walk=0., n=None, **kwargs):
+        super().__init__( plant.n if n is None else n, **kwargs )
+        self.plant = plant
+        self.rate = _param( rate, self.n )
+        self.walk = _param( walk, self.n )
+        self.offset = np.zeros( self.n )
+
+    def f( self, x, idx=None ):
+        d = _at( self.rate, idx ) + _at( self.walk, idx ) * self.rng.standard_normal( len( x ) )
+        if idx is None:
+            self.offset += d
+        else:
+            self.offset[idx] += d
+        return self.plant.f( x, idx ) + _at( self.offset, idx )
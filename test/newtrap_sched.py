@@ -0,0 +1,197 @@
+#!/bin/python3
+
+# Newton-Raphon method process control -- scheduling many loops
+#
+# Scheduler: one instrument shared by many NewtRap loops
+# Each measurement goes to the loop where it should reduce the error most:
+# priority = expected gain + measurements since the loop was last seen / revisit
+# gain is the distance from target in error bands (0 once in band)
+#   capped -- a Newton step from far off does as well as from nearer
+#   halved every measurement that doesn't get closer (unreachable,
+#   bound, noise) so a stuck loop can't hog the instrument
+# Far off loops are measured first, converged loops are still checked
+# now and then in case they have drifted. Everything ages at the same
+# rate, so the order never changes between measurements -- a plain heap
+#
+# MultiRate: many controllers in a newtrap_bank.Bank, each at its own period
+# (below)
+#
+# needs numpy
+#
+# Usage:
+# import newtrap_sched
+# sched = newtrap_sched.Scheduler( [ newtrap.NewtRap( ... ) for i in range(100) ] )
+#
+# while True:
+#     i = sched.pick()
+#     sched.next( my_instrument( i ) ) # new setting is sched.x[i]
+#
+# bank = newtrap_bank.Bank( n, ... )
+# rates = newtrap_sched.MultiRate( bank, periods, tick=.01 )
+# rates.run( lambda idx: my_sensors( idx, bank.x[idx] ), ticks )
+
+import heapq
+import math
+import time
+
+import numpy as np
+
+class Scheduler():
+    # loops are NewtRap (or anything with next(value), target and error)
+    # revisit is how many measurements one error band of distance is worth
+    # (default one pass through all the loops), cap the most bands that count
+    def __init__(self, loops, revisit=None, cap=10.):
+        self.loops = list( loops )
+        self.revisit = revisit if revisit is not None else len( self.loops )
+        self.cap = cap
+        self.weight = [ 1. ] * len( self.loops ) # halved while not improving
+        self.last = [ math.inf ] * len( self.loops ) # last distance
+        self.t = 0 # measurements so far
+        self.counts = [ 0 ] * len( self.loops ) # measurements per loop
+        # first call only primes each loop
+        self.x = [ nr.next( 0 ) for nr in self.loops ]
+        # (-priority, loop) -- never measured go first, in order
+        self.heap = [ ( -math.inf, i ) for i in range( len( self.loops ) ) ]
+
+    def pick( self ):
+        # loop to measure next
+        return self.heap[0][1]
+
+    def benefit( self, i, value ):
+        # expected gain from measuring loop i again
+        nr = self.loops[i]
+        d = abs( value - nr.target ) / nr.error if nr.error else math.inf
+        if d <= 1:
+            # in band
+            self.weight[i] = 1.
+            d = 0.
+        elif d >= self.last[i]:
+            # no closer
+            self.weight[i] *= .5
+        else:
+            self.weight[i] = min( 1., 2 * self.weight[i] )
+        self.last[i] = d
+        return self.weight[i] * min( d, self.cap )
+
+    def next( self, value ):
+        # value measured for the loop from pick() -- returns its new x
+        i = self.pick()
+        self.x[i] = self.loops[i].next( value )
+        self.t += 1
+        self.counts[i] += 1
+        # priority at time t is benefit + (t - tlast)/revisit -- drop the
+        # common t/revisit to keep the key fixed
+        key = self.benefit( i, value ) - self.t / self.revisit
+        heapq.heapreplace( self.heap, ( -key, i ) )
+        return self.x[i]
+
+    def reset( self, i ):
+        # loop i changed (new target ...) -- measure it next
+        for k, ( key, j ) in enumerate( self.heap ):
+            if j == i:
+                self.weight[i] = 1.
+                self.last[i] = math.inf
+                self.heap[k] = ( -math.inf, i )
+                heapq.heapify( self.heap )
+                return
+
+class MultiRate():
+    # drive a newtrap_bank.Bank, each controller at its own period
+    # Periods are rounded to whole ticks (at least 1). Controllers due in
+    # the same tick are stepped together, one bank.next( values, idx )
+    #
+    # Hierarchical timer wheel: levels of 256 slots, level l counts
+    # 256^l ticks a slot. A controller sits in the lowest level where its
+    # due tick shares the higher digits with now, so a level 0 slot holds
+    # exactly the ones due at that tick. Each time a level wraps, the
+    # next slot up is spread into the level below. Slots hold numpy
+    # index arrays, so the Python work per tick is a few hundred appends
+    # at most, whatever the number of controllers
+    #
+    # clock and sleep give the time (seconds) -- run() keeps each tick on
+    # schedule and records how late the updates were
+    def __init__(self, bank, periods, tick=.01, clock=time.monotonic, sleep=time.sleep):
+        self.bank = bank
+        self.tick = tick
+        self.clock = clock
+        self.sleep = sleep
+        self.period = np.maximum( 1, np.rint( np.asarray( periods, dtype=np.float64 ) / tick ) ).astype( np.int64 )
+        self.now = 0 # ticks
+        self.levels = 1
+        while self.period.max() >= 256 ** self.levels:
+            self.levels += 1
+        self.wheel = [ [ [] for s in range(256) ] for l in range( self.levels ) ]
+        self.when = np.zeros( len( self.period ), dtype=np.int64 ) # due tick
+        # spread the first updates over each period
+        n = len( self.period )
+        self.insert( np.arange( n ), 1 + ( np.arange( n ) * 40503 ) % self.period )
+        self.updates = 0
+        self.late_sum = 0. # seconds, summed over updates
+        self.late_max = 0.
+
+    def insert( self, idx, due ):
+        # controllers idx, due at ticks due, into their slots
+        if len( idx ) == 0:
+            return
+        self.when[idx] = due
+        diff = due ^ self.now
+        level = np.zeros( len( idx ), dtype=np.int64 )
+        for l in range( 1, self.levels ):
+            level[ ( diff >> ( 8 * l ) ) != 0 ] = l
+        key = level * 256 + ( ( due >> ( 8 * level ) ) & 255 )
+        order = np.argsort( key, kind='stable' )
+        key = key[order]
+        idx = idx[order]
+        edges = np.flatnonzero( np.diff( key ) ) + 1
+        for k, group in zip( key[ np.r_[ 0, edges ] ], np.split( idx, edges ) ):
+            self.wheel[ k // 256 ][ k % 256 ].append( group )
+
+    def take( self, level, slot ):
+        # empty a slot, one index array
+        s = self.wheel[level][slot]
+        self.wheel[level][slot] = []
+        if len( s ) == 0:
+            return np.zeros( 0, dtype=np.int64 )
+        if len( s ) == 1:
+            return s[0]
+        return np.concatenate( s )
+
+    def due( self ):
+        # advance one tick, controllers due now (index array)
+        self.now += 1
+        # cascade, highest level first
+        for l in range( self.levels - 1, 0, -1 ):
+            if self.now % ( 256 ** l ) == 0:
+                idx = self.take( l, ( self.now >> ( 8 * l ) ) & 255 )
+                if len( idx ):
+                    self.insert( idx, self.when[idx] )
+        self.idx = self.take( 0, self.now & 255 )
+        return self.idx
+
+    def next( self, values ):
+        # readings for the controllers from due() -- returns the bank's x
+        # each one is due again a period from now
+        x = self.bank.next( values, self.idx )
+        self.insert( self.idx, self.now + self.period[self.idx] )
+        return x
+
+    def run( self, read, ticks ):
+        # real time loop -- read( idx ) gives the readings for controllers idx
+        # (at their settings bank.x[idx]), ticks is how many to run
+        start = self.clock()
+        for k in range( ticks ):
+            idx = self.due()
+            t = start + self.now * self.tick
+            wait = t - self.clock()
+            if wait > 0:
+                self.sleep( wait )
+            if len( idx ):
+                self.next( read( idx ) )
+                late = self.clock() - t
+                self.updates += len( idx )
+                self.late_sum += late * len( idx )
+                self.late_max = max( self.late_max, late )
+
+    def lateness( self ):
+        # mean and worst seconds from due to new setting
+        return self.late_sum / max( self.updates, 1 ), self.late_max
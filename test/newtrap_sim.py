@@ -0,0 +1,139 @@
+#!/bin/python3
+
+# Newton-Raphon method process control -- discrete event simulation
+#
+# Simulate fleets of loops on a virtual clock -- hours in seconds, and the
+# same result every run (seeded noise, ties broken by order of scheduling)
+#
+# Sim: the clock and event queue, at( t, action, args ) runs action(*args) at t
+# Lag: plants, f(x) seen through a first order lag after a dead time,
+#      with measurement noise -- one object for many loops (arrays)
+# Loops: a group of loops sampled together -- read the plants, deliver
+#      the readings to the controllers after a latency, apply the new
+#      settings to the plants after their dead time
+#      controllers are a newtrap_bank.Bank (stepped with the group's
+#      indices, one call) or a list of NewtRap (anything with next(value, t))
+#
+# needs numpy
+#
+# Usage:
+# import newtrap_sim
+# sim = newtrap_sim.Sim()
+# plant = newtrap_sim.Lag( newtrap_plants.Polynomial( [ 0, 0, 1 ], n ).f, n, tau=5., dead=1., noise=.1 )
+# bank = newtrap_bank.Bank( n, target=4, error=.1, lo=0, hi=10 )
+# for g in range(10):
+#     newtrap_sim.Loops( sim, bank, plant, np.arange( g, n, 10 ), period=1., phase=g/10 )
+# sim.run( 3600 )
+
+import heapq
+
+import numpy as np
+
+import newtrap_bank
+
+class Sim():
+    # virtual clock (seconds) and event queue
+    def __init__(self):
+        self.now = 0.
+        self.queue = []
+        self.seq = 0 # order of scheduling, for ties
+        self.events = 0 # events run so far
+
+    def at( self, t, action, *args ):
+        # run action(*args) at time t
+        heapq.heappush( self.queue, ( t, self.seq, action, args ) )
+        self.seq += 1
+
+    def run( self, until ):
+        # events up to time until, then the clock stops there
+        while self.queue and self.queue[0][0] <= until:
+            t, seq, action, args = heapq.heappop( self.queue )
+            self.now = t
+            action( *args )
+            self.events += 1
+        self.now = until
+
+class Lag():
+    # n plants -- output approaches f( x, idx ) with time constant tau
+    # (f as the noise free f of a newtrap_plants model)
+    # x takes effect dead seconds after it is set
+    # tau, dead and noise are per plant (arrays) or one for all
+    # readings add uniform noise of width noise (seeded)
+    def __init__(self, f, n, tau=0., dead=0., noise=0., seed=0):
+        self.f = f
+        self.n = n
+        self.tau = np.broadcast_to( np.asarray( tau, dtype=np.float64 ), (n,) )
+        self.dead = np.broadcast_to( np.asarray( dead, dtype=np.float64 ), (n,) )
+        self.noise = np.broadcast_to( np.asarray( noise, dtype=np.float64 ), (n,) )
+        self.rng = np.random.default_rng( seed )
+        self.y = np.zeros( n ) # output, noise free
+        self.u = np.zeros( n ) # where the output is heading
+        self.t = np.zeros( n ) # time of y
+
+    def advance( self, idx, t ):
+        # outputs idx at time t -- exact for a constant u
+        tau = self.tau[idx]
+        dt = t - self.t[idx]
+        decay = np.exp( -dt / np.where( tau > 0, tau, 1. ) )
+        decay[ tau <= 0 ] = 0.
+        self.y[idx] = self.u[idx] + ( self.y[idx] - self.u[idx] ) * decay
+        self.t[idx] = t
+
+    def read( self, idx, t ):
+        self.advance( idx, t )
+        return self.y[idx] + self.noise[idx] * ( self.rng.random( len( idx ) ) - .5 )
+
+    def apply( self, idx, x, t ):
+        # x reaches the plants idx (dead time already past)
+        self.advance( idx, t )
+        self.u[idx] = self.f( x, idx )
+
+class Loops():
+    # loops idx, started together at time phase, then sampled every period
+    # readings reach the controllers latency seconds after the sample
+    def __init__(self, sim, controller, plant, idx, period=1., phase=0., latency=0.):
+        self.sim = sim
+        self.controller = controller
+        self.plant = plant
+        self.idx = np.asarray( idx )
+        self.period = period
+        self.latency = latency
+        self.bank = isinstance( controller, newtrap_bank.Bank )
+        if self.bank:
+            self.target = controller.target[self.idx]
+            self.error = controller.error[self.idx]
+        else:
+            self.target = np.array( [ controller[i].target for i in self.idx ] )
+            self.error = np.array( [ controller[i].error for i in self.idx ] )
+        self.settled = np.full( len( self.idx ), np.nan ) # first sample in band
+        self.updates = 0
+        sim.at( phase, self.start )
+
+    def start( self ):
+        # first call only primes the controllers -- apply their first x
+        self.step( np.zeros( len( self.idx ) ), self.sim.now )
+        self.sim.at( self.sim.now + self.period, self.sample )
+
+    def sample( self ):
+        t = self.sim.now
+        values = self.plant.read( self.idx, t )
+        first = np.isnan( self.settled ) & ( np.abs( values - self.target ) <= self.error )
+        self.settled[first] = t
+        self.sim.at( t + self.latency, self.deliver, values, t )
+        self.sim.at( t + self.period, self.sample )
+
+    def deliver( self, values, t ):
+        # readings taken at t reach the controllers
+        self.step( values, t )
+        self.updates += len( self.idx )
+
+    def step( self, values, t ):
+        if self.bank:
+            x = self.controller.next( values, self.idx )[self.idx]
+        else:
+            x = np.array( [ self.controller[i].next( v, t ) for i, v in zip( self.idx, values ) ] )
+        # each dead time its own event
+        dead = self.plant.dead[self.idx]
+        for d in np.unique( dead ):
+            k = dead == d
+            self.sim.at( self.sim.now + d, self.plant.apply, self.idx[k], x[k], self.sim.now + d )
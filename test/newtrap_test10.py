@@ -0,0 +1,59 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- measurement filter chains
+
+Study = "Measurement filters"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import matplotlib.pyplot as plt
+import random
+
+S = 1
+lo = 0*S
+hi = 10*S
+err = .01*S
+target1 = 4*S
+target2 = 6*S
+
+def f( x ):
+    # occasional wild reading on top of the usual noise
+    y = x ** 2 + S*random.random()
+    if random.random() < .05:
+        y += 10*S*random.random()
+    return y
+
+chains = {
+    "IIR only":       None,
+    "IIR .3 fixed":   [ ('_yiir',.3) ],
+    "gate + IIR":     [ ('_gate',4*S), '_yiir' ],
+    "median 3 + IIR": [ ('_median',3), '_yiir' ],
+    "average 2":      [ ('_average',2), '_yiir' ],
+    }
+
+passes = 50
+
+fig = plt.figure()
+
+for name in chains:
+    es = np.zeros( 200 )
+    for p in range(passes):
+        nr = newtrap.NewtRap( target1, err, lo, hi, yfilter=chains[name] )
+        y = 0
+        for i in range(200):
+            if i == 100:
+                nr.target = target2
+            x = nr.next(y)
+            y = f(x)
+            es[i] += abs(nr.target - y) / passes
+    print( "{:16s} mean |error| steps 50-100 {:.3f}, 150-200 {:.3f}".format( name, es[50:100].mean(), es[150:].mean() ) )
+    plt.plot(es,label=name)
+
+plt.title('NewtRap example -- measurement filter chains')
+plt.semilogy()
+plt.legend()
+plt.show()
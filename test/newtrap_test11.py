@@ -0,0 +1,50 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- noise floor calibration
+
+Study = "Noise calibration"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import matplotlib.pyplot as plt
+import random
+
+S = 1
+lo = 0*S
+hi = 10*S
+err = .01*S
+target1 = 4*S
+
+def f( x ):
+    return x ** 2 + S*random.random()
+
+passes = 50
+
+fig = plt.figure()
+
+for name, cal in ( ("no calibration",0), ("calibrate 20",20) ):
+    es = np.zeros( 200 )
+    moves = 0
+    for p in range(passes):
+        nr = newtrap.NewtRap( target1, err, lo, hi, calibrate=cal )
+        y = 0
+        lastx = None
+        for i in range(200):
+            x = nr.next(y)
+            y = f(x)
+            es[i] += abs(nr.target - y) / passes
+            if i >= 100 and x != lastx:
+                moves += 1
+            lastx = x
+    print( "{:16s} band {:.3f} reachable {} -- x moves per step (last 100) {:.2f}, mean |error| {:.3f}".format(
+        name, nr.error, nr.reachable, moves / passes / 100, es[100:].mean() ) )
+    plt.plot(es,label=name)
+
+plt.title('NewtRap example -- noise floor calibration')
+plt.semilogy()
+plt.legend()
+plt.show()
@@ -0,0 +1,56 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- stochastic approximation near the root
+
+Study = "x error vs measurements"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import matplotlib.pyplot as plt
+import random
+
+S = 1
+lo = 0*S
+hi = 10*S
+err = .01*S
+target1 = 4*S
+root = (target1 - .5*S) ** .5 # noise averages S/2
+
+def f( x ):
+    return x ** 2 + S*random.random()
+
+steps = 800
+checks = ( 50, 100, 200, 400, 800 )
+passes = 50
+
+modes = {
+    "pairs":             dict(),
+    "pairs, calibrated": dict( calibrate=20 ),
+    "stochastic":        dict( calibrate=20, stochastic=True ),
+    }
+
+fig = plt.figure()
+
+print( "median |x - root| after n measurements" )
+print( "{:20s}".format("n") + "".join( "{:>10d}".format(c) for c in checks ) )
+for name in modes:
+    xe = np.zeros( (passes, steps) )
+    for p in range(passes):
+        nr = newtrap.NewtRap( target1, err, lo, hi, **modes[name] )
+        y = 0
+        for i in range(steps):
+            x = nr.next(y)
+            y = f(x)
+            xe[p,i] = abs( x - root )
+    med = np.median( xe, axis=0 )
+    print( "{:20s}".format(name) + "".join( "{:10.4f}".format(med[c-1]) for c in checks ) )
+    plt.plot(med,label=name)
+
+plt.title('NewtRap example -- x error vs measurements')
+plt.loglog()
+plt.legend()
+plt.show()
@@ -0,0 +1,53 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- scale sweep (compare newtrap_test3.py)
+
+Study = "Scale invariance"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import random
+
+passes = 50
+steps = 200
+
+def to_band( S, bounded, x0=True ):
+    # measurements until the response is first in the error band
+    # plant, target, bounds and band all scaled together
+    # no bounds and no x0 has nothing to scale by -- it starts at 1 and 3
+    # whatever S is, the one case that is not flat: above 1 expansion
+    # finds the root in a few probes a decade, below 1 each pair only
+    # shrinks x by about a third (x^2, input filter) -- 20 or so
+    # measurements a decade, 1e-9 does not make it in 200
+    lo = 0*S
+    hi = 10*S
+    err = .01*S
+    target = 4*S
+    def f( x ):
+        return S * ( (x/S) ** 2 + .005*random.random() )
+    if bounded:
+        nr = newtrap.NewtRap( target, err, lo, hi )
+    elif x0:
+        nr = newtrap.NewtRap( target, err, x0=S )
+    else:
+        nr = newtrap.NewtRap( target, err )
+    y = 0
+    for i in range(steps):
+        x = nr.next(y)
+        y = f(x)
+        if abs( y - target ) <= err:
+            return i+1
+    return steps
+
+print( "mean (worst) measurements to band, {} runs, {} = did not converge".format(passes,steps) )
+print( "{:>8s} {:>16s} {:>16s} {:>16s}".format( "scale", "bounded", "x0 only", "nothing" ) )
+for e in range(-9,10,3):
+    S = 10. ** e
+    b = [ to_band(S,True) for p in range(passes) ]
+    u = [ to_band(S,False) for p in range(passes) ]
+    z = [ to_band(S,False,False) for p in range(passes) ]
+    print( "{:>8.0e} {:>10.1f} ({:3d}) {:>10.1f} ({:3d}) {:>10.1f} ({:3d})".format( S, np.mean(b), max(b), np.mean(u), max(u), np.mean(z), max(z) ) )
@@ -0,0 +1,40 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- bracket expansion for unbounded runs (compare newtrap_test4.py)
+
+Study = "Unbounded start-up"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import random
+
+passes = 50
+steps = 400
+
+def to_band( target, power, expand ):
+    # measurements until the response is first in the error band
+    # no bounds and no x0 -- the controller has no idea of scale
+    err = .01*target
+    def f( x ):
+        return abs(x) ** power + .001*target*random.random()
+    nr = newtrap.NewtRap( target, err, expand=expand )
+    y = 0
+    for i in range(steps):
+        x = nr.next(y)
+        y = f(x)
+        if abs( y - target ) <= err:
+            return i+1
+    return steps
+
+print( "mean (worst) measurements to band, {} runs, {} = did not converge".format(passes,steps) )
+print( "{:>6s} {:>8s} {:>16s} {:>16s}".format( "plant", "target", "no expansion", "expansion" ) )
+for power in ( 2, 3 ):
+    for e in range(2,10,2):
+        target = 10. ** e
+        a = [ to_band(target,power,False) for p in range(passes) ]
+        b = [ to_band(target,power,True) for p in range(passes) ]
+        print( "{:>6s} {:>8.0e} {:>10.1f} ({:3d}) {:>10.1f} ({:3d})".format( "x^"+str(power), target, np.mean(a), max(a), np.mean(b), max(b) ) )
@@ -0,0 +1,44 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- log(x) mode on a power-law plant
+
+Study = "Six decades"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import random
+
+passes = 20
+steps = 400
+lo = 1e-3
+hi = 1e3
+power = 1.5
+
+def f( x ):
+    # power law with 0.1% multiplicative noise
+    return x ** power * ( 1 + .001*random.random() )
+
+def to_band( root, logx, logy=False ):
+    # measurements until the response is first in the 1% band
+    target = root ** power
+    err = .01 * target
+    nr = newtrap.NewtRap( target, err, lo, hi, logx=logx, logy=logy )
+    y = 0
+    for i in range(steps):
+        x = nr.next(y)
+        y = f(x)
+        if abs( y - target ) <= err:
+            return i+1
+    return steps
+
+print( "x^{} on [{}, {}] -- mean (worst) measurements to 1% band, {} = did not converge".format(power,lo,hi,steps) )
+print( "{:>8s} {:>16s} {:>16s} {:>16s}".format( "root", "linear", "log x", "log x, log y" ) )
+for root in ( .003, .03, .3, 3, 30, 300 ):
+    a = [ to_band(root,False) for p in range(passes) ]
+    b = [ to_band(root,True) for p in range(passes) ]
+    c = [ to_band(root,True,True) for p in range(passes) ]
+    print( "{:>8g} {:>10.1f} ({:3d}) {:>10.1f} ({:3d}) {:>10.1f} ({:3d})".format( root, np.mean(a), max(a), np.mean(b), max(b), np.mean(c), max(c) ) )
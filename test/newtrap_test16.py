@@ -0,0 +1,63 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- trust region, Monte Carlo (compare newtrap_test6m.py and pinned.txt)
+
+Study = "Pinned runs"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import math
+import random
+
+passes = 100
+
+# name: plant, target1, target2, lo, hi, settled band (about the noise)
+scenarios = {
+    "10 - x^2":    ( lambda x: 10 - x ** 2 + random.random(),           7,  3,  0,  10, .5 ),
+    "tanh(x-5)":   ( lambda x: math.tanh(x-5) + .1*random.random(),    .5, -.5, 0,  10, .05 ),
+    "sin(x)":      ( lambda x: math.sin(x) + .1*random.random(),       .5, -.5, 0,  10, .05 ),
+    "x^2, wide":   ( lambda x: x ** 2 + random.random(),                4,  6,  0, 100, .5 ),
+    }
+
+def Pass( nr, f, target1, target2, lo, hi, band ):
+    # returns steps at a bound, steps to settle after each target
+    # same controller every pass, as in newtrap_test6m.py
+    nr.target = target1
+    y = 0
+    pinned = 0
+    settle = [ 100, 100 ]
+    for i in range(200):
+        if i == 100:
+            nr.target = target2
+        x = nr.next(y)
+        y = f(x)
+        if x == lo or x == hi:
+            pinned += 1
+        if abs( nr.target - y ) <= band and settle[i//100] == 100:
+            settle[i//100] = i % 100 + 1
+    return pinned, settle
+
+def Runs( name, options ):
+    f, target1, target2, lo, hi, band = scenarios[name]
+    nr = newtrap.NewtRap( target1, .01, lo, hi, **options )
+    pinned = []
+    settle = []
+    for p in range(passes):
+        pin, s = Pass( nr, f, target1, target2, lo, hi, band )
+        pinned.append( pin )
+        settle += s
+    pinned = np.array( pinned )
+    return pinned.mean(), 100*np.mean( pinned > 100 ), np.mean( settle )
+
+if __name__ == "__main__":
+    print( "{} runs of 200 steps, pinned = more than half the steps at a bound".format(passes) )
+    print( "{:12s} {:>24s}   {:>24s}".format( "", "plain", "trust region" ) )
+    print( "{:12s} {:>8s}{:>8s}{:>8s}   {:>8s}{:>8s}{:>8s}".format( "scenario", "@bound", "pinned", "settle", "@bound", "pinned", "settle" ) )
+    for name in scenarios:
+        a = Runs( name, dict() )
+        b = Runs( name, dict( trust=True ) )
+        print( "{:12s} {:8.2f}{:7.0f}%{:8.1f}   {:8.2f}{:7.0f}%{:8.1f}".format( name, *a, *b ) )
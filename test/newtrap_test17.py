@@ -0,0 +1,49 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- three point sets, inverse quadratic vs linear (compare newtrap_test5m_3.py)
+
+Study = "Superlinear"
+
+
+import newtrap_14 as newtrap
+
+import math
+
+steps = 300
+lo = 0
+hi = 10
+
+# smooth, noise free plants -- name: function, target
+plants = {
+    "x^2":        ( lambda x: x ** 2,                 4 ),
+    "10 - x^2":   ( lambda x: 10 - x ** 2,            3 ),
+    "x^3 + x":    ( lambda x: x ** 3 + x,             20 ),
+    "exp(x/2)":   ( lambda x: math.exp( x / 2 ),      20 ),
+    "tanh(x-5)":  ( lambda x: math.tanh( x - 5 ),     .5 ),
+    }
+
+controllers = {
+    "pairs":            lambda t, e: newtrap.NewtRap( t, e, lo, hi ),
+    "3 point linear":   lambda t, e: newtrap.NewtRap3( t, e, lo, hi, iqi=False ),
+    "3 point IQI":      lambda t, e: newtrap.NewtRap3( t, e, lo, hi ),
+    }
+
+def to_band( make, f, target, err ):
+    # measurements until the response is first in the error band
+    nr = make( target, err )
+    y = 0
+    for i in range(steps):
+        x = nr.next(y)
+        y = f(x)
+        if abs( y - target ) <= err:
+            return i+1
+    return steps
+
+for rel in ( 1e-2, 1e-6, 1e-10 ):
+    print( "measurements to band, error = {:g} x target ({} = did not converge)".format( rel, steps ) )
+    print( "{:12s}".format("plant") + "".join( "{:>16s}".format(c) for c in controllers ) )
+    for name in plants:
+        f, target = plants[name]
+        print( "{:12s}".format(name) + "".join( "{:16d}".format( to_band( controllers[c], f, target, rel*abs(target) ) ) for c in controllers ) )
+    print()
@@ -0,0 +1,55 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- secant mode (one measurement per update) vs pairs with midpoint
+
+Study = "Measurements per update"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import math
+import random
+
+steps = 300
+passes = 50
+lo = 0
+hi = 10
+
+# name: function, target
+plants = {
+    "x^2":        ( lambda x: x ** 2,                 4 ),
+    "10 - x^2":   ( lambda x: 10 - x ** 2,            3 ),
+    "x^3 + x":    ( lambda x: x ** 3 + x,             20 ),
+    "exp(x/2)":   ( lambda x: math.exp( x / 2 ),      20 ),
+    "tanh(x-5)":  ( lambda x: math.tanh( x - 5 ),     .5 ),
+    }
+
+def to_band( f, target, err, noise, secant ):
+    # measurements until the response is first in the error band
+    # (for noise, in the band and the noise together)
+    # and mean |error| over the second half, once settled
+    nr = newtrap.NewtRap( target, err, lo, hi, secant=secant )
+    y = 0
+    first = steps
+    late = 0
+    for i in range(steps):
+        x = nr.next(y)
+        y = f(x) + noise * ( random.random() - .5 )
+        if abs( y - target ) <= err + .5 * noise and first == steps:
+            first = i+1
+        if i >= steps // 2:
+            late += abs( y - target ) / ( steps - steps // 2 )
+    return first, late
+
+for rel, noise in ( ( 1e-2, 0 ), ( 1e-8, 0 ), ( 1e-2, .01 ), ( 1e-2, .1 ) ):
+    print( "mean measurements to band, error = {:g} x target, noise {:g} x target ({} = did not converge)".format( rel, noise, steps ) )
+    print( "{:12s} {:>12s} {:>12s} {:>24s}".format( "plant", "pairs", "secant", "late |error| / target" ) )
+    for name in plants:
+        f, target = plants[name]
+        a = np.array( [ to_band( f, target, rel*abs(target), noise*abs(target), False ) for p in range(passes) ] )
+        b = np.array( [ to_band( f, target, rel*abs(target), noise*abs(target), True ) for p in range(passes) ] )
+        print( "{:12s} {:12.1f} {:12.1f} {:12.4f}{:12.4f}".format( name, a[:,0].mean(), b[:,0].mean(), a[:,1].mean()/abs(target), b[:,1].mean()/abs(target) ) )
+    print()
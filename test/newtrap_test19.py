@@ -0,0 +1,46 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- unreachable targets and extremum seeking
+
+Study = "Unreachable"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import random
+
+S = 1
+passes = 50
+steps = 200
+
+def f( x ):
+    # can't go above 10 (plus noise)
+    return 10 - x ** 2 + .1*S*random.random()
+
+best = 10 + .05*S # closest achievable on average
+
+def Pass( target, lo, hi, seek, secant=False ):
+    # mean shortfall from the best achievable output, and when it was flagged
+    nr = newtrap.NewtRap( target, .01*S, lo, hi, seek=seek, secant=secant )
+    y = 0
+    shortfall = 0
+    flagged = steps
+    for i in range(steps):
+        x = nr.next(y)
+        y = f(x)
+        shortfall += ( best - y ) / steps
+        if nr.unreachable and flagged == steps:
+            flagged = i+1
+    return shortfall, flagged
+
+print( "f(x) = 10 - x^2, target out of reach, {} runs of {} steps".format(passes,steps) )
+print( "{:>8s} {:>10s} {:>14s} {:>14s} {:>10s} {:>14s}".format( "target", "bounds", "shortfall", "with seek", "flagged", "secant, seek" ) )
+for target in ( 11, 15, 30 ):
+    for lo, hi in ( (0,10), (-5,5) ):
+        a = np.array( [ Pass( target, lo, hi, False ) for p in range(passes) ] )
+        b = np.array( [ Pass( target, lo, hi, True ) for p in range(passes) ] )
+        c = np.array( [ Pass( target, lo, hi, True, True ) for p in range(passes) ] )
+        print( "{:8g} {:>10s} {:14.4f} {:14.4f} {:10.1f} {:14.4f}".format( target, "{},{}".format(lo,hi), a[:,0].mean(), b[:,0].mean(), b[:,1].mean(), c[:,0].mean() ) )
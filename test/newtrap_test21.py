@@ -0,0 +1,59 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- stall detection, damping a 2-cycle or bisecting when stuck
+
+Study = "Stall damping"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import math
+import random
+
+passes = 400
+steps = 200
+
+def cbrt( x ):
+    return math.copysign( abs(x) ** (1/3), x )
+
+# name: plant, target, lo, hi, band
+# cube root and arctan are the textbook Newton-Raphson 2-cycles
+scenarios = {
+    "10 - x^2":        ( lambda x: 10 - x ** 2 + random.random(),             7,  0,  10, .5 ),
+    "tanh(x-5)":       ( lambda x: math.tanh(x-5) + .1*random.random(),      .5,  0,  10, .05 ),
+    "sin(x)":          ( lambda x: math.sin(x) + .1*random.random(),         .5,  0,  10, .05 ),
+    "cbrt(x-5)":       ( lambda x: cbrt(x-5) + .01*random.random(),          .5,  0,  10, .02 ),
+    "atan(x-5)":       ( lambda x: math.atan(x-5) + .01*random.random(),      1,  0,  10, .02 ),
+    "atan, unbounded": ( lambda x: math.atan(x-5) + .01*random.random(),      1, None, None, .02 ),
+    "x^2, scaled":     ( lambda x: 1e4 * ( (x/1e4) ** 2 + .005*random.random() ), 4e4, 0, 1e5, 100 ),
+    }
+
+def Pass( name, damping ):
+    # measurements to the band, mean |error| over the second half
+    f, target, lo, hi, band = scenarios[name]
+    if lo is None:
+        nr = newtrap.NewtRap( target, band/2, x0=3, damping=damping )
+    else:
+        nr = newtrap.NewtRap( target, band/2, lo, hi, damping=damping )
+    y = 0
+    first = steps
+    err = 0
+    for i in range(steps):
+        x = nr.next(y)
+        y = f(x)
+        if abs( y - target ) <= band and first == steps:
+            first = i+1
+        if i >= steps//2:
+            err += abs( y - target ) / ( steps - steps//2 )
+    return first, err / band, nr.stalls
+
+print( "{} runs, steps to band ({} = never), late |error| in bands, stalls per run".format(passes,steps) )
+print( "{:16s} {:>24s}   {:>24s}".format( "", "no damping", "damping" ) )
+print( "{:16s} {:>8s}{:>8s}{:>8s}   {:>8s}{:>8s}{:>8s}".format( "scenario", "steps", "error", "stalls", "steps", "error", "stalls" ) )
+for name in scenarios:
+    a = np.mean( [ Pass( name, False ) for p in range(passes) ], axis=0 )
+    b = np.mean( [ Pass( name, True ) for p in range(passes) ], axis=0 )
+    print( "{:16s} {:8.1f}{:8.2f}{:8.1f}   {:8.1f}{:8.2f}{:8.1f}".format( name, *a, *b ) )
@@ -0,0 +1,66 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- plant change detection (gain or offset jumps half way)
+
+Study = "Plant changes"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import random
+
+passes = 200
+steps = 400
+change = 200
+band = .5
+
+lo = 0
+hi = 10
+target = 4
+
+# name: gain, offset after the change
+changes = {
+    "no change":    ( 1.,  0. ),
+    "gain x3":      ( 3.,  0. ),
+    "gain x0.3":    ( .3,  0. ),
+    "offset +3":    ( 1.,  3. ),
+    "offset -3":    ( 1., -3. ),
+    }
+
+def Pass( gain, offset, detect, mode ):
+    # steps to band after the change, mean |error| after, false alarms before
+    nr = newtrap.NewtRap( target, .01, lo, hi, detect=detect, **mode )
+    g, o = 1., 0.
+    y = 0
+    err = 0
+    back = steps - change
+    for i in range(steps):
+        if i == change:
+            g, o = gain, offset
+            before = nr.changes
+        x = nr.next(y)
+        y = g * x ** 2 + o + random.random()
+        if i >= change:
+            err += abs( y - target ) / ( steps - change )
+            if abs( y - target ) <= band and back == steps - change:
+                back = i - change + 1
+    return back, err, before
+
+# pairs, and stochastic approximation once inside the noise
+modes = {
+    "pairs":        dict(),
+    "stochastic":   dict( calibrate=20, stochastic=True ),
+    }
+
+print( "{} runs, plant x^2 + noise, target {}, change at step {} of {}".format( passes, target, change, steps ) )
+for mode in modes:
+    print()
+    print( "{:12s} {:>24s}   {:>24s}".format( mode, "no detection", "detection" ) )
+    print( "{:12s} {:>8s}{:>8s}{:>8s}   {:>8s}{:>8s}{:>8s}".format( "change", "steps", "error", "alarms", "steps", "error", "alarms" ) )
+    for name in changes:
+        a = np.mean( [ Pass( *changes[name], False, modes[mode] ) for p in range(passes) ], axis=0 )
+        b = np.mean( [ Pass( *changes[name], True, modes[mode] ) for p in range(passes) ], axis=0 )
+        print( "{:12s} {:8.1f}{:8.2f}{:8.2f}   {:8.1f}{:8.2f}{:8.2f}".format( name, *a, *b ) )
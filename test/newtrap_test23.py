@@ -0,0 +1,49 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- dead time, plant responds k readings late (estimate finds k < 10)
+
+Study = "Dead time"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import random
+
+passes = 100
+steps = 600
+
+lo = 0
+hi = 10
+target = 4
+band = .05
+
+def f( x ):
+    return x ** 2 + .01*random.random()
+
+def to_band( k, delay ):
+    # readings until the response is in the band for good (steps = never)
+    nr = newtrap.NewtRap( target, .01, lo, hi, delay=delay )
+    line = [ f(hi) ] * k # readings in the pipe
+    y = f(hi)
+    last = steps
+    for i in range(steps):
+        x = nr.next(y)
+        line.append( f(x) )
+        y = line.pop(0)
+        if abs( y - target ) > band:
+            last = steps
+        elif last == steps:
+            last = i + 1
+    return last, nr.delay
+
+print( "{} runs, readings to stay in the band, x^2 with k readings of dead time ({} = never)".format(passes,steps) )
+print( "{:>4s} {:>10s} {:>16s} {:>16s} {:>8s}".format( "k", "ignored", "delay=k", "estimated", "found" ) )
+for k in ( 0, 1, 2, 5, 9 ):
+    a = [ to_band( k, 0 )[0] for p in range(passes) ]
+    b = [ to_band( k, k )[0] for p in range(passes) ]
+    c = [ to_band( k, None ) for p in range(passes) ]
+    print( "{:4d} {:10.1f} {:8.1f} ({:5.1f}) {:8.1f} ({:5.1f}) {:8.2f}".format( k, np.mean(a),
+        np.mean(b), np.mean(b)/(k+1), np.mean([ x[0] for x in c ]), np.mean([ x[0] for x in c ])/(k+1), np.mean([ x[1] for x in c ]) ) )
@@ -0,0 +1,80 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- timestamped readings at irregular times
+
+Study = "Irregular sampling"
+
+
+import newtrap_14 as newtrap
+
+import numpy as np
+
+import math
+import random
+
+passes = 100
+T = 400. # simulated time
+tau = .5 # plant lag
+band = .1
+
+lo = 0
+hi = 10
+target = 4
+
+def readings():
+    # irregular reading times -- usually about 1 apart, with bursts,
+    # gaps, and a stalled sensor that repeats its last reading
+    t = 0.
+    while t < T:
+        r = random.random()
+        if r < .1:
+            for i in range(5):
+                t += .05
+                yield t, False
+        elif r < .15:
+            t += 10.
+            yield t, False
+        elif r < .25:
+            yield t, True
+        else:
+            t += random.expovariate( 1. )
+            yield t, False
+
+def Pass( timed, settle ):
+    # time to stay in the band, mean |error| over the second half
+    nr = newtrap.NewtRap( target, .01, lo, hi, settle=settle )
+    z = hi ** 2 # plant state
+    x = hi
+    y = z
+    tl = 0.
+    inband = T
+    err = []
+    for t, stalled in readings():
+        if not stalled:
+            # plant follows x ** 2 with lag tau
+            z = x ** 2 + ( z - x ** 2 ) * math.exp( -( t - tl ) / tau )
+            y = z + .02 * random.random()
+            tl = t
+        if abs( z - target ) > band:
+            inband = T
+        elif inband == T:
+            inband = t
+        if t > T / 2:
+            err.append( abs( z - target ) )
+        if timed:
+            x = nr.next( y, t )
+        else:
+            x = nr.next( y )
+    return inband, np.mean( err )
+
+print( "{} runs over time {}, lag {}, bursts, gaps and stalled readings".format( passes, T, tau ) )
+print( "{:22s} {:>12s} {:>12s}".format( "", "settled at", "late |error|" ) )
+modes = {
+    "per call":             ( False, 0. ),
+    "timestamped":          ( True, 0. ),
+    "timestamped, settle":  ( True, 3*tau ),
+    }
+for name in modes:
+    r = np.array( [ Pass( *modes[name] ) for p in range(passes) ] )
+    print( "{:22s} {:12.1f} {:12.3f}".format( name, np.median( r[:,0] ), np.mean( r[:,1] ) ) )
@@ -0,0 +1,62 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- coupled inputs and outputs, Broyden vs one scalar loop per channel
+
+Study = "Multivariable"
+
+
+import newtrap_14 as newtrap
+import newtrap_multi
+
+import numpy as np
+
+passes = 20
+steps = 500
+err = .01
+noise = .001
+
+def plant( n, coupling, curve ):
+    # y = A x + curve * x^2, A has a unit diagonal and random coupling
+    # returns the plant and a reachable target
+    A = np.eye( n ) + coupling * np.random.uniform( -1, 1, (n,n) ) / n ** .5
+    np.fill_diagonal( A, 1. )
+    def f( x ):
+        x = np.array( x )
+        return A @ x + curve * x ** 2 + noise * np.random.random( n )
+    xs = np.random.uniform( -5, 5, n )
+    return f, list( A @ xs + curve * xs ** 2 )
+
+class Scalars:
+    # one NewtRap per channel, x[i] controls y[i]
+    def __init__( self, target, error, lo, hi ):
+        self.loops = [ newtrap.NewtRap( t, error, lo, hi ) for t in target ]
+    def next( self, y ):
+        return [ nr.next( v ) for nr, v in zip( self.loops, y ) ]
+
+def to_band( n, coupling, curve, make ):
+    f, target = plant( n, coupling, curve )
+    nr = make( target, err, -10, 10 )
+    y = [ 0 ] * n
+    for i in range(steps):
+        x = nr.next( y )
+        y = f( x )
+        if np.all( np.abs( y - np.array( target ) ) <= err ):
+            return i+1
+    return steps
+
+controllers = {
+    "scalar loops":   Scalars,
+    "Broyden":        newtrap_multi.NewtRapN,
+    }
+
+print( "median (worst) measurements until all outputs are in the band, {} runs, {} = did not converge".format(passes,steps) )
+print( "{:>4s} {:>9s} {:>6s}".format( "n", "coupling", "x^2" ) + "".join( "{:>18s}".format(c) for c in controllers ) )
+for n in ( 2, 5, 20 ):
+    for coupling in ( .3, 1. ):
+        for curve in ( 0., .05 ):
+            line = "{:4d} {:9.1f} {:6.2f}".format( n, coupling, curve )
+            for c in controllers:
+                r = [ to_band( n, coupling, curve, controllers[c] ) for p in range(passes) ]
+                line += "{:>11.1f} ({:3d})".format( np.median(r), max(r) )
+            print( line )
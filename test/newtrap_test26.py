@@ -0,0 +1,60 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- SPSA vs finite difference Jacobians in many dimensions
+
+Study = "SPSA"
+
+
+import newtrap_multi
+
+import numpy as np
+
+steps = 40000
+err = .01
+noise = .001
+
+def plant( n ):
+    # y = A x + .05 x^2, A has a unit diagonal and random coupling
+    A = np.eye( n ) + .3 * np.random.uniform( -1, 1, (n,n) ) / n ** .5
+    np.fill_diagonal( A, 1. )
+    def f( x ):
+        x = np.array( x )
+        return A @ x + .05 * x ** 2 + noise * np.random.random( n )
+    xs = np.random.uniform( -5, 5, n )
+    return f, list( A @ xs + .05 * xs ** 2 )
+
+class FdJacobian(newtrap_multi.NewtRapN):
+    # a new finite difference Jacobian (n+1 measurements) for every step
+    def next( self, values ):
+        if self.probing is None and not self.very_first:
+            y = [ values[i] - self._target[i] for i in range( self.n ) ]
+            if all( abs( y[i] ) <= self._error[i] for i in range( self.n ) ):
+                return list( self.x )
+            self.probe_start()
+        return super().next( values )
+
+def to_band( n, make ):
+    f, target = plant( n )
+    nr = make( target, err, -10, 10 )
+    y = [ 0 ] * n
+    for i in range(steps):
+        x = nr.next( y )
+        y = f( x )
+        if np.all( np.abs( y - np.array( target ) ) <= err ):
+            return i+1
+    return steps
+
+controllers = {
+    "FD every step":  FdJacobian,
+    "Broyden":        newtrap_multi.NewtRapN,
+    "SPSA":           newtrap_multi.SpsaN,
+    }
+
+print( "mean measurements until all outputs are in the band ({} = did not converge)".format(steps) )
+print( "{:>4s} {:>6s}".format( "n", "runs" ) + "".join( "{:>16s}".format(c) for c in controllers ) )
+for n, passes in ( ( 10, 10 ), ( 50, 5 ), ( 200, 2 ) ):
+    line = "{:4d} {:6d}".format( n, passes )
+    for c in controllers:
+        line += "{:16.0f}".format( np.mean( [ to_band( n, controllers[c] ) for p in range(passes) ] ) )
+    print( line )
@@ -0,0 +1,74 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- controller bank, shared memory shards, scaling with cores
+
+Study = "Bank scaling"
+
+
+import newtrap_14 as newtrap
+import newtrap_bank
+
+import numpy as np
+
+import os
+import random
+import time
+
+def Same( n=50, steps=300 ):
+    # bank against the scalar class, noisy x^2 plants, one target change
+    # returns the largest difference in x
+    targets = [ 1 + 8 * random.random() for i in range(n) ]
+    bank = newtrap_bank.Bank( n, target=targets, error=.01, lo=0, hi=10 )
+    nrs = [ newtrap.NewtRap( t, .01, 0, 10, escape=False, damping=False, detect=False ) for t in targets ]
+    noise = np.random.random( (steps, n) )
+    y = np.zeros( n )
+    worst = 0.
+    for i in range(steps):
+        if i == steps // 2:
+            bank.set_target( slice(None), 5. )
+            for nr in nrs:
+                nr.target = 5.
+        x = bank.next( y ).copy()
+        xs = np.array( [ nrs[k].next( y[k] ) for k in range(n) ] )
+        worst = max( worst, np.max( np.abs( x - xs ) ) )
+        y = x ** 2 + .1 * noise[i]
+    return worst
+
+def Rate( n, workers, ticks=20 ):
+    # controller steps per second, noisy x^2 plants
+    targets = 1 + 8 * np.random.random( n )
+    if workers == 0:
+        bank = newtrap_bank.Bank( n, target=targets, error=.01, lo=0, hi=10 )
+    else:
+        bank = newtrap_bank.ShardedBank( n, target=targets, error=.01, lo=0, hi=10, workers=workers )
+    noise = .1 * np.random.random( n )
+    y = np.zeros( n )
+    bank.next( y ) # warm up
+    t = time.perf_counter()
+    for i in range(ticks):
+        x = bank.next( y )
+        y = x * x
+        y += noise
+    t = time.perf_counter() - t
+    if workers:
+        bank.close()
+    return n * ticks / t
+
+if __name__ == "__main__":
+    print( "bank vs NewtRap (escape, damping, detect off), largest |x difference| {:.2e}".format( Same() ) )
+    print()
+    n = 1000000
+    cores = len( os.sched_getaffinity(0) )
+    print( "{} controllers, {} cores available".format( n, cores ) )
+    print( "{:>8s} {:>14s} {:>8s} {:>10s}".format( "workers", "steps/s", "speedup", "efficiency" ) )
+    base = Rate( n, 0 )
+    print( "{:>8s} {:>14.3e} {:>8s} {:>10s}".format( "inline", base, "", "" ) )
+    one = None
+    for w in sorted( set( [ 1, 2, 4, 8, cores ] ) ):
+        if w > max( cores, 2 ):
+            continue
+        r = Rate( n, w )
+        if one is None:
+            one = r
+        print( "{:>8d} {:>14.3e} {:>8.2f} {:>9.0f}%".format( w, r, r / one, 100 * r / one / w ) )
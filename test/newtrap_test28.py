@@ -0,0 +1,100 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- controller bank in a file, killed mid update and recovered
+
+Study = "Crash recovery"
+
+
+import newtrap_bank
+
+import numpy as np
+
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+
+n = 200000
+kills = 20
+
+def plant( x, g ):
+    # noisy x^2, noise fixed by the tick so any run can be replayed
+    return x * x + .1 * np.random.default_rng( g ).random( n )
+
+def targets():
+    return 1 + 8 * np.random.default_rng( 0 ).random( n )
+
+def Run( filename, ticks ):
+    # child -- step the bank in the file until told to stop (or killed)
+    bank = newtrap_bank.MappedBank( filename, n, target=targets(), error=.01, lo=0, hi=10 )
+    while bank.generation < ticks:
+        g = bank.generation
+        if g == ticks // 2:
+            bank.set_target( slice(None), 5. )
+        else:
+            bank.next( plant( bank.x, g ) )
+
+class Reference():
+    # same run in memory, state bytes after the latest few updates
+    # (asked for in increasing order, give or take one)
+    def __init__( self ):
+        self.bank = newtrap_bank.Bank( n, target=targets(), error=.01, lo=0, hi=10 )
+        self.g = 0
+        self.states = { 0: bytes( self.bank.buffer ) }
+
+    def state( self, g, ticks ):
+        while self.g < g:
+            if self.g == ticks // 2:
+                self.bank.set_target( slice(None), 5. )
+            else:
+                self.bank.next( plant( self.bank.x, self.g ) )
+            self.g += 1
+            self.states[self.g] = bytes( self.bank.buffer )
+            self.states.pop( self.g - 3, None )
+        return self.states[g]
+
+if __name__ == "__main__":
+    ticks = 400
+    ref = Reference()
+    filename = os.path.join( tempfile.mkdtemp(), "bank.dat" )
+    ctx = multiprocessing.get_context( "fork" )
+    rng = np.random.default_rng( 1 )
+    size = len( ref.state( 0, ticks ) )
+    good = 0
+    torn = 0
+    print( "{} controllers, killed {} times at random, {} updates".format( n, kills, ticks ) )
+    for k in range( kills + 1 ):
+        p = ctx.Process( target=Run, args=( filename, ticks ) )
+        p.start()
+        if k < kills:
+            time.sleep( rng.uniform( .05, .5 ) )
+            os.kill( p.pid, signal.SIGKILL )
+        p.join()
+
+        # reopen -- committed copy must match the reference exactly
+        t = time.perf_counter()
+        bank = newtrap_bank.MappedBank( filename )
+        t = time.perf_counter() - t
+        g = bank.generation
+        if bytes( bank.buffer[:size] ) == ref.state( g, ticks ):
+            good += 1
+        # the spare copy shows whether the kill hit an update
+        spare = bytes( bank.regions[ ( g + 1 ) % 2 ][:size] )
+        if g > 0 and spare != ref.state( g - 1, ticks ) and spare != ref.state( g + 1, ticks ):
+            torn += 1
+        print( "{:>4s} at update {:4d}, reopened in {:6.2f} ms".format( "kill" if k < kills else "end", g, 1000 * t ) )
+        bank.close()
+    print( "recovered state exact {} of {} times, {} kills caught mid update".format( good, kills + 1, torn ) )
+    os.remove( filename )
+
+    # cost of the copy and the flushes
+    for name, bank in ( ( "in memory", newtrap_bank.Bank( n, target=targets(), error=.01, lo=0, hi=10 ) ),
+                        ( "mapped", newtrap_bank.MappedBank( filename, n, target=targets(), error=.01, lo=0, hi=10 ) ) ):
+        t = time.perf_counter()
+        for g in range(20):
+            bank.next( plant( bank.x, g ) )
+        print( "{:>10s} {:6.1f} ms per update".format( name, 1000 * ( time.perf_counter() - t ) / 20 ) )
+    bank.close()
+    os.remove( filename )
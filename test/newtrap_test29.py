@@ -0,0 +1,57 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- controller bank memory, float32 against float64
+
+Study = "Bank memory and precision"
+
+
+import newtrap_14 as newtrap
+import newtrap_bank
+
+import numpy as np
+
+import tracemalloc
+
+def PerObject( count=2000 ):
+    # bytes per scalar NewtRap, everything it allocates
+    tracemalloc.start()
+    nrs = [ newtrap.NewtRap( 4, .01, 0, 10 ) for i in range(count) ]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / count
+
+def PerBank( dtype, count=100000 ):
+    # bytes per controller in a bank, state only
+    bank = newtrap_bank.Bank( count, target=4, error=.01, lo=0, hi=10, dtype=dtype )
+    return len( bank.buffer ) / count
+
+def InBand( dtype, rel, n=1000, steps=300 ):
+    # noise free x^2, error band rel * target
+    # fraction in the band at the end, and mean steps to first reach it
+    targets = 1 + 8 * np.random.default_rng( 0 ).random( n )
+    error = rel * targets
+    bank = newtrap_bank.Bank( n, target=targets, error=error, lo=0, hi=10, dtype=dtype )
+    y = np.zeros( n )
+    hit = np.full( n, steps )
+    for i in range(steps):
+        x = bank.next( y ).astype( np.float64 )
+        y = x * x
+        inband = np.abs( y - targets ) <= error
+        hit[ inband & ( hit == steps ) ] = i + 1
+    return 100 * np.mean( inband ), np.mean( hit )
+
+if __name__ == "__main__":
+    print( "bytes per controller" )
+    print( "{:>24s} {:8.0f}".format( "NewtRap objects", PerObject() ) )
+    for dtype in ( np.float64, np.float32 ):
+        print( "{:>24s} {:8.0f}".format( "bank, " + np.dtype( dtype ).name, PerBank( dtype ) ) )
+    print()
+    print( "noise free x^2, band = error / target, {} steps = never".format( 300 ) )
+    print( "{:>8s} {:>18s} {:>18s}".format( "", "float64", "float32" ) )
+    print( "{:>8s} {:>9s}{:>9s} {:>9s}{:>9s}".format( "band", "in band", "steps", "in band", "steps" ) )
+    for e in range( -2, -10, -1 ):
+        rel = 10. ** e
+        a = InBand( np.float64, rel )
+        b = InBand( np.float32, rel )
+        print( "{:>8.0e} {:8.1f}%{:9.1f} {:8.1f}%{:9.1f}".format( rel, *a, *b ) )
@@ -0,0 +1,73 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- controller bank, stepping only the active controllers
+
+Study = "Sparse bank updates"
+
+
+import newtrap_14 as newtrap
+import newtrap_bank
+
+import numpy as np
+
+import time
+
+def Same( n=50, steps=400, p=.3 ):
+    # sparse bank against scalar controllers called only when measured
+    # noisy x^2, each controller measured with probability p a tick
+    rng = np.random.default_rng( 0 )
+    targets = 1 + 8 * rng.random( n )
+    bank = newtrap_bank.Bank( n, target=targets, error=.01, lo=0, hi=10 )
+    nrs = [ newtrap.NewtRap( t, .01, 0, 10, escape=False, damping=False, detect=False ) for t in targets ]
+    x = np.zeros( n )
+    worst = 0.
+    for i in range(steps):
+        idx = np.flatnonzero( rng.random( n ) < p )
+        y = x[idx] ** 2 + .1 * rng.random( len( idx ) )
+        xb = bank.next( y, idx ).copy()
+        for k, v in zip( idx, y ):
+            x[k] = nrs[k].next( v )
+        worst = max( worst, np.max( np.abs( xb - x ) ) )
+    return worst
+
+def Converged( n, hold ):
+    # bank holding in band everywhere (noise free x^2)
+    targets = 1 + 8 * np.random.default_rng( 0 ).random( n )
+    bank = newtrap_bank.Bank( n, target=targets, error=.01, lo=0, hi=10, hold=hold )
+    y = np.zeros( n )
+    for i in range(100):
+        y = bank.next( y ) ** 2
+    return bank, targets
+
+def Tick( bank, values, idx=None, ticks=20 ):
+    # ms per call
+    t = time.perf_counter()
+    for i in range(ticks):
+        bank.next( values, idx )
+    return 1000 * ( time.perf_counter() - t ) / ticks
+
+if __name__ == "__main__":
+    print( "sparse bank vs NewtRap called only when measured, largest |x difference| {:.2e}".format( Same() ) )
+    print()
+    n = 1000000
+    print( "{} controllers, ms per tick".format( n ) )
+    print( "  idx  -- readings only for the active ones (index array)" )
+    print( "  hold -- readings for all, the rest in band and holding" )
+    print( "  full -- readings for all, every controller stepped" )
+    print( "{:>9s} {:>8s} {:>8s} {:>8s}".format( "activity", "idx", "hold", "full" ) )
+    rng = np.random.default_rng( 1 )
+    for frac in ( .01, .1, 1. ):
+        idx = np.sort( rng.permutation( n )[:int( frac * n )] )
+        bank, targets = Converged( n, True )
+        held = np.sum( ( bank.flags & newtrap_bank._holding ) != 0 )
+        # out of band for the active ones, in band for the rest
+        values = targets.copy()
+        values[idx] += 10 * bank.error[idx]
+        a = Tick( bank, values[idx], idx )
+        bank, targets = Converged( n, True )
+        b = Tick( bank, values )
+        bank, targets = Converged( n, False )
+        c = Tick( bank, values )
+        print( "{:>8.0f}% {:8.1f} {:8.1f} {:8.1f}".format( 100 * frac, a, b, c ) )
+    print( "({:.1f}% holding before the timed ticks)".format( 100 * held / n ) )
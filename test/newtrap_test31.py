@@ -0,0 +1,72 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- one instrument shared by many loops, priority vs round robin
+
+Study = "Measurement scheduling"
+
+
+import newtrap_14 as newtrap
+import newtrap_sched
+
+import numpy as np
+
+import random
+
+loops = 200
+slots = 20000 # measurements
+passes = 5
+
+class Plants():
+    # a_i x^2 + b_i + noise, b_i jumps now and then
+    def __init__( self, rng, jumps ):
+        self.rng = rng
+        self.a = rng.uniform( .5, 2, loops )
+        self.b = rng.uniform( -1, 1, loops )
+        self.jumps = jumps # chance of a jump per measurement slot
+        self.target = rng.uniform( 10, 40, loops )
+
+    def drift( self ):
+        if self.rng.random() < self.jumps:
+            self.b[ self.rng.integers( loops ) ] += self.rng.normal( 0, 5 )
+
+    def y( self, x ):
+        # true outputs, no noise
+        return self.a * x * x + self.b
+
+    def measure( self, i, x ):
+        return self.a[i] * x * x + self.b[i] + .2 * ( self.rng.random() - .5 )
+
+def Run( scheduled, jumps, seed ):
+    # mean distance from target (error bands, capped at 100 a loop)
+    # and mean percent of loops in band, over all slots
+    rng = np.random.default_rng( seed )
+    random.seed( seed )
+    p = Plants( rng, jumps )
+    nrs = [ newtrap.NewtRap( p.target[i], .2, 0, 10 ) for i in range(loops) ]
+    sched = newtrap_sched.Scheduler( nrs )
+    x = np.array( sched.x )
+    dist = 0.
+    inband = 0.
+    for s in range(slots):
+        p.drift()
+        if scheduled:
+            i = sched.pick()
+            x[i] = sched.next( p.measure( i, x[i] ) )
+        else:
+            i = s % loops
+            x[i] = nrs[i].next( p.measure( i, x[i] ) )
+        d = np.abs( p.y( x ) - p.target ) / .2
+        dist += np.minimum( d, 100 ).sum()
+        inband += np.mean( d <= 1 )
+    return dist / slots / loops, 100 * inband / slots
+
+if __name__ == "__main__":
+    print( "{} loops, {} measurements, mean over {} runs".format( loops, slots, passes ) )
+    print( "distance = |y - target| in error bands (capped at 100), mean over loops and time" )
+    print( "{:>14s} {:>20s} {:>20s}".format( "", "round robin", "priority" ) )
+    print( "{:>14s} {:>10s}{:>10s} {:>10s}{:>10s}".format( "jumps/slot", "distance", "in band", "distance", "in band" ) )
+    for jumps in ( 0, .001, .01, .05 ):
+        r = np.mean( [ Run( False, jumps, s ) for s in range(passes) ], axis=0 )
+        q = np.mean( [ Run( True, jumps, s ) for s in range(passes) ], axis=0 )
+        print( "{:>14g} {:10.2f}{:9.1f}% {:10.2f}{:9.1f}%".format( jumps, *r, *q ) )
@@ -0,0 +1,63 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- many controllers at their own periods, virtual clock
+
+Study = "Multi-rate scheduling"
+
+
+import newtrap_bank
+import newtrap_sched
+
+import numpy as np
+
+import time
+
+tick = .01 # seconds
+seconds = 60 # simulated
+
+class VirtualClock():
+    # real time while computing, sleeps skipped -- the schedule runs as
+    # if in real time, as fast as the machine allows
+    def __init__( self ):
+        self.offset = 0.
+        self.idle = 0.
+
+    def clock( self ):
+        return time.perf_counter() + self.offset
+
+    def sleep( self, s ):
+        self.offset += s
+        self.idle += s
+
+def Run( n ):
+    # n controllers, periods log uniform from 10 ms to 10 min
+    rng = np.random.default_rng( 0 )
+    periods = 10 ** rng.uniform( -2, np.log10( 600 ), n )
+    targets = 1 + 8 * rng.random( n )
+    bank = newtrap_bank.Bank( n, target=targets, error=.01, lo=0, hi=10 )
+    vc = VirtualClock()
+    rates = newtrap_sched.MultiRate( bank, periods, tick=tick, clock=vc.clock, sleep=vc.sleep )
+    last = np.full( n, -1 )
+    wrong = [ 0 ]
+    def read( idx ):
+        # noisy x^2 -- and check each update is exactly a period after the last
+        seen = idx[ last[idx] >= 0 ]
+        wrong[0] += np.sum( rates.now - last[seen] != rates.period[seen] )
+        last[idx] = rates.now
+        return bank.x[idx] ** 2 + .1 * rng.random( len( idx ) )
+    ticks = int( seconds / tick )
+    t = time.perf_counter()
+    rates.run( read, ticks )
+    t = time.perf_counter() - t
+    busy = t / ( t + vc.idle )
+    expect = np.sum( ticks // rates.period ) # about -- first updates are staggered
+    return rates.updates / seconds, expect / seconds, 100 * busy, *rates.lateness(), wrong[0]
+
+if __name__ == "__main__":
+    print( "periods 10 ms to 10 min (log uniform), {} ms tick, {} s simulated, one core".format( int( 1000 * tick ), seconds ) )
+    print( "busy = share of the real time spent computing, late = due tick to new setting" )
+    print( "{:>8s} {:>12s} {:>12s} {:>7s} {:>10s} {:>10s} {:>8s}".format( "loops", "updates/s", "expected/s", "busy", "mean late", "max late", "off beat" ) )
+    for n in ( 1000, 10000, 100000 ):
+        u, e, busy, mean, worst, wrong = Run( n )
+        print( "{:>8d} {:>12.0f} {:>12.0f} {:>6.1f}% {:>8.2f}ms {:>8.2f}ms {:>8d}".format( n, u, e, busy, 1000 * mean, 1000 * worst, wrong ) )
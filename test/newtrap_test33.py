@@ -0,0 +1,61 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- discrete event simulation of loop fleets, virtual clock
+
+Study = "Fleet simulation"
+
+
+import newtrap_14 as newtrap
+import newtrap_bank
+import newtrap_plants
+import newtrap_sim
+
+import numpy as np
+
+import time
+
+def Fleet( n, hours, scalar=False, groups=50, seed=0 ):
+    # a x^2 + b plants, lag up to .2 period, dead time up to .4 period,
+    # reading latency .1 period, noise, periods 1 to 10 s
+    # loops in groups sharing a period, phase and dead time (same equipment)
+    rng = np.random.default_rng( seed )
+    a = rng.uniform( .5, 2, n )
+    b = rng.uniform( -1, 1, n )
+    targets = rng.uniform( 10, 40, n )
+    gperiod = rng.choice( [ 1., 2., 5., 10. ], groups )
+    gdead = np.round( 4 * rng.random( groups ) ) / 10 * gperiod
+    group = np.arange( n ) % groups
+    plant = newtrap_sim.Lag( newtrap_plants.Polynomial( [ b, 0, a ], n ).f, n,
+        tau=.2 * rng.random( n ) * gperiod[group], dead=gdead[group], noise=.1, seed=seed )
+    if scalar:
+        controller = [ newtrap.NewtRap( targets[i], .2, 0, 10 ) for i in range(n) ]
+    else:
+        controller = newtrap_bank.Bank( n, target=targets, error=.2, lo=0, hi=10 )
+    sim = newtrap_sim.Sim()
+    loops = [ newtrap_sim.Loops( sim, controller, plant, np.flatnonzero( group == g ), period=gperiod[g], phase=g * gperiod[g] / groups, latency=.1 * gperiod[g] ) for g in range(groups) ]
+    t = time.perf_counter()
+    sim.run( 3600 * hours )
+    t = time.perf_counter() - t
+    settled = np.concatenate( [ l.settled for l in loops ] )
+    # in band at the end, noise free
+    plant.advance( np.arange( n ), sim.now )
+    inband = np.abs( plant.y - targets ) <= .2
+    updates = sum( l.updates for l in loops )
+    return t, sim.events, updates, settled, inband
+
+if __name__ == "__main__":
+    a = Fleet( 1000, .25 )
+    b = Fleet( 1000, .25 )
+    same = np.array_equal( a[3], b[3], equal_nan=True ) and np.array_equal( a[4], b[4] )
+    print( "two runs, same seed: {}".format( "identical" if same else "DIFFERENT" ) )
+    print()
+    print( "{:>22s} {:>6s} {:>8s} {:>9s} {:>10s} {:>12s} {:>8s} {:>8s} {:>8s}".format(
+        "", "hours", "wall s", "sim/wall", "events", "updates/s", "settled", "median", "in band" ) )
+    for name, n, hours, scalar in ( ( "NewtRap objects", 1000, 1, True ),
+                                    ( "bank", 1000, 1, False ),
+                                    ( "bank", 10000, 4, False ) ):
+        t, events, updates, settled, inband = Fleet( n, hours, scalar )
+        print( "{:>22s} {:6g} {:8.1f} {:9.0f} {:10d} {:12.0f} {:7.1f}% {:7.1f}s {:7.1f}%".format(
+            "{} x {}".format( n, name ), hours, t, 3600 * hours / t, events, updates / t,
+            100 * np.mean( ~np.isnan( settled ) ), np.nanmedian( settled ), 100 * np.mean( inband ) ) )
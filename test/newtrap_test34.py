@@ -0,0 +1,63 @@
+# test program for newtrap
+# Paul H Alfille
+
+# version 14 -- plant model library, vectorized against scalar plants
+
+Study = "Plant models"
+
+
+import newtrap_bank
+import newtrap_plants as plants
+
+import numpy as np
+
+import random
+import time
+
+n = 100000
+
+def Models( n ):
+    # one of each, parameters spread over the plants, targets about 4
+    rng = np.random.default_rng( 0 )
+    return {
+        "polynomial":  plants.Polynomial( [ 0, 0, rng.uniform( .5, 2, n ) ], n, noise=.05 ),
+        "saturating":  plants.Saturating( span=8, center=rng.uniform( 3, 7, n ), width=2, n=n, noise=.05 ),
+        "power law":   plants.PowerLaw( a=1, p=rng.uniform( .5, 3, n ), n=n, noise=.05 ),
+        "hysteretic":  plants.Hysteretic( w=rng.uniform( 0, .5, n ), gain=1, n=n, noise=.05 ),
+        "lag":         plants.Lag( plants.Polynomial( [ 0, 0, 1 ], n ), tau=rng.uniform( .1, 2, n ), noise=.05 ),
+        "drifting":    plants.Drifting( plants.Polynomial( [ 0, 0, 1 ], n ), walk=.01, noise=.05 ),
+        }
+
+def Scalar( x ):
+    # the scripts' way, one x at a time
+    return [ v ** 2 + .05 * random.random() for v in x ]
+
+def PerEval( f, x, reps=5 ):
+    # ns per plant evaluation
+    t = time.perf_counter()
+    for r in range(reps):
+        f( x )
+    return 1e9 * ( time.perf_counter() - t ) / reps / len( x )
+
+def Control( plant, steps=200 ):
+    # bank on these plants, percent of the last readings in band
+    # (plus the noise width)
+    bank = newtrap_bank.Bank( n, target=4, error=.1, lo=0, hi=10 )
+    y = np.zeros( n )
+    for i in range(steps):
+        y = plant( bank.next( y ) )
+    return 100 * np.mean( np.abs( y - 4 ) <= .1 + .05 )
+
+if __name__ == "__main__":
+    x = np.random.default_rng( 1 ).uniform( 0, 10, n )
+    a = Models( n )["drifting"]( x )
+    b = Models( n )["drifting"]( x )
+    print( "same seed, same outputs: {}".format( np.array_equal( a, b ) ) )
+    print()
+    print( "{} plants, ns per plant evaluation".format( n ) )
+    print( "{:>16s} {:>8.1f}".format( "scalar x^2", PerEval( Scalar, list( x ) ) ) )
+    print( "{:>16s} {:>8s} {:>10s}".format( "model", "ns", "in band" ) )
+    models = Models( n )
+    for name, plant in models.items():
+        ns = PerEval( plant, x )
+        print( "{:>16s} {:8.1f} {:9.1f}%".format( name, ns, Control( Models( n )[name] ) ) )